@@ -0,0 +1,152 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Synthetic statements, rule files and Ledger output for benchmarks.
+
+Every generator takes a ``seed``, so the same arguments always give
+the same data.
+"""
+
+import datetime
+import random
+
+MERCHANTS = [
+    'WOOLWORTHS', 'COLES', 'ALDI', 'BP', 'SHELL', 'CALTEX', 'TELSTRA',
+    'OPTUS', 'QANTAS', 'MYER', 'KMART', 'BUNNINGS', 'OFFICEWORKS',
+    'JB HI-FI', 'HARVEY NORMAN', 'DAN MURPHYS', 'CHEMIST WAREHOUSE',
+]
+SUBURBS = [
+    'SYDNEY', 'MELBOURNE', 'BRISBANE', 'PERTH', 'ADELAIDE', 'HOBART',
+    'DARWIN', 'CANBERRA', 'NEWCASTLE', 'GEELONG',
+]
+CATEGORIES = [
+    'Groceries', 'Fuel', 'Phone', 'Travel', 'Clothing', 'Hardware',
+    'Office', 'Electronics', 'Alcohol', 'Health',
+]
+
+
+def description(rand):
+    """Return a card transaction description."""
+    return '{} {} {:04d} {}'.format(
+        rand.choice(MERCHANTS),
+        rand.choice(SUBURBS),
+        rand.randrange(10000),
+        rand.choice(['AU', 'AUS', 'NSW', 'VIC']),
+    )
+
+
+def statement(rows, layout='amount', seed=0):
+    """Return the text of a CSV statement.
+
+    ``layout`` is ``'amount'`` for a signed Amount column, or
+    ``'debit_credit'`` for separate Debit and Credit columns.  About
+    one row in ten is a credit.
+    """
+    rand = random.Random(seed)
+    if layout == 'amount':
+        lines = ['Date,Description,Amount']
+    elif layout == 'debit_credit':
+        lines = ['Date,Description,Debit,Credit']
+    else:
+        raise ValueError('unknown layout: {}'.format(layout))
+    date = datetime.date(2011, 7, 1)
+    for i in xrange(rows):
+        date += datetime.timedelta(days=rand.random() < 0.2)
+        amount = '{}.{:02d}'.format(
+            rand.randrange(1, 1000), rand.randrange(100)
+        )
+        credit = rand.random() < 0.1
+        desc = 'SALARY ACME PTY LTD' if credit else description(rand)
+        if layout == 'amount':
+            fields = [amount if credit else '-' + amount]
+        else:
+            fields = ['', amount] if credit else ['-' + amount, '']
+        lines.append(','.join(
+            [date.strftime('%d/%m/%Y'), '"{}"'.format(desc)] + fields
+        ))
+    return '\n'.join(lines) + '\n'
+
+
+def rules(count, seed=0):
+    """Return the lines of a rule file of count rules.
+
+    The rules are a mix of description literals and patterns, amounts
+    and account conditions, as a hand-written rule file might be.  The
+    last rule gives every transaction a low-scoring destination.
+    """
+    rand = random.Random(seed)
+    lines = ['# {} generated rules'.format(count)]
+    for i in xrange(count - 1):
+        account = 'Expenses:{}:{}'.format(rand.choice(CATEGORIES), i)
+        kind = rand.randrange(6)
+        if kind == 0:
+            condition = 'desc "^{} {}"'.format(
+                rand.choice(MERCHANTS), rand.choice(SUBURBS)
+            )
+        elif kind == 1:
+            condition = 'desc "{} .* {:04d}"'.format(
+                rand.choice(MERCHANTS), rand.randrange(10000)
+            )
+        elif kind == 2:
+            condition = 'desc "{}" gt {}'.format(
+                rand.choice(SUBURBS), rand.randrange(1000)
+            )
+        elif kind == 3:
+            condition = 'eq {}.{:02d}'.format(
+                rand.randrange(1, 1000), rand.randrange(100)
+            )
+        elif kind == 4:
+            low = rand.randrange(1000)
+            condition = 'ge {} lt {}'.format(low, low + rand.randrange(1, 20))
+        else:
+            condition = 'from Assets:Bank:{} desc "{}"'.format(
+                rand.choice(['Cheque', 'Savings']), rand.choice(MERCHANTS)
+            )
+        lines.append('{} then to {} {}'.format(
+            condition, account, rand.choice([5000, 8000, 9000])
+        ))
+    if count:
+        lines.append('then to Expenses:Unknown 8000')
+    return lines
+
+
+def balance_report(accounts, seed=0):
+    """Return the output of ``ledger balance`` for about accounts accounts.
+
+    Accounts are nested up to four deep, and the report ends with the
+    rule and total that Ledger prints.
+    """
+    rand = random.Random(seed)
+    lines = []
+
+    def add(depth, budget):
+        while budget > 0:
+            budget -= 1
+            children = 0
+            if depth < 3 and budget and rand.random() < 0.4:
+                children = rand.randrange(1, min(budget, 8) + 1)
+                budget -= children
+            lines.append('{:>20}{}{}'.format(
+                '${:.2f}'.format(rand.uniform(-10000, 10000)),
+                '  ' * (depth + 1),
+                'Account{}'.format(len(lines)),
+            ))
+            add(depth + 1, children)
+
+    add(0, accounts)
+    lines.append('-' * 20)
+    lines.append('{:>20}'.format('0'))
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,316 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Time the statement-processing hot path on synthetic data.
+
+Run from the top of the source tree::
+
+    python -m bench.run [--rows N] [--rules N] [--accounts N]
+                        [--repeat N] [--output FILE] [--baseline FILE]
+
+Each stage of lt-stmtproc's work is timed on its own, and then all of
+it end to end, by running ``lt-stmtproc --batch`` on the statement:
+starting the interpreter, reading the statement, matching rules,
+choosing outcomes and writing Ledger transactions.  Balance report
+parsing, as done by lt-chart, is timed too.
+
+The times of every run of each stage, with the best and the median,
+are written as JSON to ``--output`` (default: standard output), along
+with the parameters, the revision and the platform, so that results
+can be kept and compared across releases.  A summary is printed on
+standard error; with ``--baseline``, it includes the ratio of each
+stage's best time to that in an earlier results file.
+"""
+
+import argparse
+import copy
+import datetime
+import json
+import os
+import platform
+import shutil
+import StringIO
+import subprocess
+import sys
+import tempfile
+import timeit
+
+from ltlib import balance
+from ltlib import index
+from ltlib import journal
+from ltlib import parse
+from ltlib import rollup
+from ltlib import score
+from ltlib import xn as xnlib
+from ltlib.readers import CSV
+
+try:
+    from ltlib import batch
+except ImportError:  # NumPy is not installed
+    batch = None
+
+from . import generate
+
+ACCOUNT = 'Assets:Bank:Cheque'
+
+TOP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(func, setup=None, repeat=5, clock=timeit.default_timer):
+    """Return the times of repeat calls of func.
+
+    If given, ``setup`` is called before each call, untimed, and its
+    result is passed to func.
+    """
+    times = []
+    for i in xrange(repeat):
+        arg = setup() if setup else None
+        start = clock()
+        func(arg)
+        times.append(clock() - start)
+    return times
+
+
+def revision():
+    """Return the git revision of the source tree, or None."""
+    try:
+        with open(os.devnull, 'w') as devnull:
+            return subprocess.check_output(
+                ['git', 'describe', '--always', '--dirty'],
+                cwd=TOP,
+                stderr=devnull
+            ).strip()
+    except (EnvironmentError, subprocess.CalledProcessError):
+        return None
+
+
+def read(text):
+    reader = CSV.Reader(file=StringIO.StringIO(text), account=ACCOUNT)
+    return list(reader)
+
+
+def complete(x):
+    """Return a copy of x with any missing endpoint filled in."""
+    x = copy.copy(x)
+    if not x.src:
+        x.src = [xnlib.Endpoint('Income:Unknown', -x.amount)]
+    if not x.dst:
+        x.dst = [xnlib.Endpoint('Expenses:Unknown', x.amount)]
+    return x
+
+
+def score_sets(results):
+    """Return fresh copies of the ScoreSets in match_rules results."""
+    sets = []
+    for scores in results:
+        for s in (scores or {}).itervalues():
+            fresh = score.ScoreSet()
+            fresh.extend(
+                (key, value)
+                for key, values in s.items.iteritems()
+                for value in values
+            )
+            sets.append(fresh)
+    return sets
+
+
+class Workspace(object):
+    """Directory holding the files of ``lt-stmtproc`` runs.
+
+    ``HOME`` is pointed at the directory, so that the runs read the
+    config file in it, and not the user's.
+    """
+    def __init__(self, text, rule_lines):
+        self.dir = tempfile.mkdtemp(prefix='ltbench')
+        self.statement = self.write('statement.csv', text)
+        self.write('rules', '\n'.join(rule_lines) + '\n')
+        self.write('.ltconfig', json.dumps({
+            'rootdir': self.dir,
+            'rulesdir': '.',
+            'rules': ['rules'],
+            'cachedir': os.path.join(self.dir, 'cache'),
+            'accounts': {ACCOUNT: {'reader': 'CSV'}},
+        }))
+        self.out = os.path.join(self.dir, 'out.dat')
+        self.queue = os.path.join(self.dir, 'queue.json')
+        self.env = dict(os.environ, HOME=self.dir, PYTHONPATH=TOP)
+
+    def write(self, name, text):
+        path = os.path.join(self.dir, name)
+        with open(path, 'w') as fh:
+            fh.write(text)
+        return path
+
+    def reset(self):
+        """Remove the output of the last run."""
+        for path in (self.out, self.queue):
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def process(self, _=None):
+        """Run ``lt-stmtproc --batch`` on the statement."""
+        with open(os.devnull, 'r+') as devnull:
+            subprocess.check_call(
+                [
+                    sys.executable,
+                    os.path.join(TOP, 'bin', 'lt-stmtproc'),
+                    '--in', self.statement,
+                    '--account', ACCOUNT,
+                    '--out', self.out,
+                    '--batch', self.queue,
+                ],
+                stdin=devnull,
+                stdout=devnull,
+                env=self.env
+            )
+
+    def close(self):
+        shutil.rmtree(self.dir)
+
+
+def journal_rollup(lines):
+    """Return a ``rollup.Rollup`` of the transactions in journal lines."""
+    totals = rollup.Rollup()
+    for x in journal.read(lines):
+        totals.add_xn(x)
+    return totals
+
+
+def stages(args):
+    """Generate ``(name, items, func, setup)`` for each stage."""
+    texts = dict(
+        (layout, generate.statement(args.rows, layout, args.seed))
+        for layout in ('amount', 'debit_credit')
+    )
+    rule_lines = generate.rules(args.rules, args.seed)
+    report = generate.balance_report(args.accounts, args.seed)
+
+    for layout, text in sorted(texts.iteritems()):
+        yield 'read_csv_' + layout, args.rows, lambda _, t=text: read(t), None
+
+    yield 'parse_rules', args.rules, \
+        lambda _: parse.file2rules(rule_lines), None
+
+    xns = read(texts['amount'])
+    rules = index.RuleIndex(parse.file2rules(rule_lines))
+    yield 'match_rules', len(xns), \
+        lambda _: [x.match_rules(rules) for x in xns], None
+    if batch is not None:
+        yield 'match_rules_batch', len(xns), \
+            lambda _: list(batch.match_rules(xns, rules)), None
+
+    results = [x.match_rules(rules) for x in xns]
+    yield 'scoreset_highest', len(xns), \
+        lambda sets: [s.highest() for s in sets], \
+        lambda: score_sets(results)
+
+    completed = map(complete, xns)
+    yield 'xn_ledger', len(completed), \
+        lambda _: '\n'.join(x.ledger() for x in completed), None
+
+    lines = '\n'.join(x.ledger() for x in completed).splitlines(True)
+    yield 'read_journal', len(completed), \
+        lambda _: list(journal.read(lines)), None
+    yield 'journal_balance', len(completed), \
+        lambda r: balance.tree(r.totals()), \
+        lambda: journal_rollup(lines)
+
+    yield 'balance', args.accounts, lambda _: balance.balance(report), None
+
+    workspace = Workspace(texts['amount'], rule_lines)
+    try:
+        yield 'end_to_end', args.rows, workspace.process, workspace.reset
+    finally:
+        workspace.close()
+
+
+def run(args):
+    results = {}
+    for name, items, func, setup in stages(args):
+        times = measure(func, setup, args.repeat)
+        results[name] = {
+            'items': items,
+            'times': times,
+            'best': min(times),
+            'median': sorted(times)[len(times) // 2],
+        }
+    return {
+        'revision': revision(),
+        'date': datetime.datetime.utcnow().isoformat() + 'Z',
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': batch is not None,
+        'parameters': {
+            'rows': args.rows,
+            'rules': args.rules,
+            'accounts': args.accounts,
+            'repeat': args.repeat,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+
+
+def summary(data, baseline=None, file=sys.stderr):
+    """Print a table of the results, compared with baseline if given."""
+    line = '{:<20} {:>8} {:>10} {:>12} {:>9}'
+    print >> file, line.format('stage', 'items', 'best s', 'us/item', 'ratio')
+    for name, result in sorted(data['results'].iteritems()):
+        ratio = ''
+        if baseline and name in baseline['results']:
+            ratio = '{:.2f}'.format(
+                result['best'] / baseline['results'][name]['best']
+            )
+        print >> file, line.format(
+            name,
+            result['items'],
+            '{:.4f}'.format(result['best']),
+            '{:.2f}'.format(result['best'] / (result['items'] or 1) * 1e6),
+            ratio
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark the statement-processing hot path'
+    )
+    parser.add_argument('--rows', type=int, default=20000,
+                        help='statement rows (default: %(default)s)')
+    parser.add_argument('--rules', type=int, default=500,
+                        help='rules in the rule file (default: %(default)s)')
+    parser.add_argument('--accounts', type=int, default=2000,
+                        help='accounts in the balance report '
+                             '(default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='runs of each stage (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the data generators')
+    parser.add_argument('--output', type=argparse.FileType('w'),
+                        default=sys.stdout,
+                        help='JSON results file (default: standard output)')
+    parser.add_argument('--baseline', type=argparse.FileType('r'),
+                        help='earlier JSON results file to compare with')
+    args = parser.parse_args(argv)
+
+    baseline = json.load(args.baseline) if args.baseline else None
+    data = run(args)
+    json.dump(data, args.output, indent=2, sort_keys=True)
+    args.output.write('\n')
+    summary(data, baseline)
+
+
+if __name__ == '__main__':
+    main()
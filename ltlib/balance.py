@@ -15,50 +15,123 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import decimal
-import itertools
 import re
 
 pattern = re.compile(r'([-\d\.]+)(\s+)(.*)')
 
 
-def match_to_dict(match):
-    """Convert a match object into a dict.
+class Node(object):
+    """An account in a balance, with its sub-accounts.
 
-    Values are:
-        indent: amount of indentation of this [sub]account
-        parent: the parent dict (None)
-        account_fragment: account name fragment
-        balance: decimal.Decimal balance
-        children: sub-accounts ([])
+    ``indent``
+      Amount of indentation of this [sub]account.
+    ``account_fragment``
+      Account name fragment, relative to the parent.
+    ``account``
+      The full account name.
+    ``balance``
+      decimal.Decimal balance, including sub-accounts.
+    ``parent``
+      The parent node, or None.
+    ``children``
+      Sub-account nodes.
     """
-    balance, indent, account_fragment = match.group(1, 2, 3)
-    return {
-        'balance': decimal.Decimal(balance),
-        'indent': len(indent),
-        'account_fragment': account_fragment,
-        'parent': None,
-        'children': [],
-    }
+    __slots__ = (
+        'balance', 'indent', 'account_fragment', 'account', 'parent',
+        'children',
+    )
+
+    def __init__(self, balance, indent, account_fragment, parent=None):
+        self.balance = balance
+        self.indent = indent
+        self.account_fragment = account_fragment
+        self.account = account_fragment if parent is None \
+            else ':'.join((parent.account, account_fragment))
+        self.parent = parent
+        self.children = []
+
+    def __repr__(self):
+        return 'Node({!r}, {!r})'.format(self.account, self.balance)
 
 
 def balance(output):
-    """Convert `ledger balance` output into an hierarchical data structure."""
-    lines = map(pattern.search, output.splitlines())
+    """Convert `ledger balance` output into an hierarchical data structure.
+
+    ``output`` is the text, or an iterable of its lines such as the
+    pipe from ledger, which is read one line at a time up to the end
+    of the accounts.  Return a list of the top-level ``Node`` objects.
+    """
+    if isinstance(output, basestring):
+        output = output.splitlines()
+    search = pattern.search
+    Decimal = decimal.Decimal
 
     stack = []
     top = []
-    for item in map(match_to_dict, itertools.takewhile(lambda x: x, lines)):
+    for line in output:
+        match = search(line.rstrip('\r\n'))
+        if match is None:
+            break  # end of the accounts
+        amount, indent, account_fragment = match.group(1, 2, 3)
+        indent = len(indent)
+
         # pop items off stack while current item has indent <=
-        while stack and item['indent'] <= stack[-1]['indent']:
+        while stack and indent <= stack[-1].indent:
             stack.pop()
 
-        # check if this is a top-level item
-        if not stack:
-            stack.append(item)
-            top.append(item)
+        if stack:
+            parent = stack[-1]
+            node = Node(Decimal(amount), indent, account_fragment, parent)
+            parent.children.append(node)
         else:
-            item['parent'] = stack[-1]
-            stack[-1]['children'].append(item)
-            stack.append(item)
+            node = Node(Decimal(amount), indent, account_fragment)
+            top.append(node)
+        stack.append(node)
 
     return top
+
+
+def tree(totals):
+    """Build the ``Node`` tree that ``balance`` makes, from account totals.
+
+    ``totals`` is a dict of the totals of accounts' own postings, by
+    account name, such as ``rollup.Rollup.totals`` returns.  As in
+    the output of ``ledger -s balance``, each account's balance
+    includes its sub-accounts, accounts are left out if neither they
+    nor any sub-account has a balance, sub-accounts are sorted by
+    name, and an account with no balance of its own and only one
+    sub-account is shown as one with it (e.g. ``Assets:Bank``).
+    """
+    def node():
+        return {'own': 0, 'balance': 0, 'children': {}}
+
+    root = node()
+    for account, total in totals.iteritems():
+        n = root
+        for fragment in account.split(':'):
+            n = n['children'].setdefault(fragment, node())
+            n['balance'] += total
+        n['own'] += total
+
+    def prune(n):
+        """Drop the sub-accounts of n that are not shown."""
+        for fragment, child in n['children'].items():
+            if not prune(child):
+                del n['children'][fragment]
+        return n['balance'] or n['children']
+
+    def items(n, indent, parent):
+        result = []
+        for fragment, child in sorted(n['children'].iteritems()):
+            while not child['own'] and len(child['children']) == 1:
+                (subfragment, child), = child['children'].items()
+                fragment = ':'.join((fragment, subfragment))
+            item = Node(
+                decimal.Decimal(child['balance']), indent, fragment, parent
+            )
+            item.children = items(child, indent + 2, item)
+            result.append(item)
+        return result
+
+    prune(root)
+    return items(root, 2, None)
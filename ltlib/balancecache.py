@@ -0,0 +1,143 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""On-disk cache of the account totals of Ledger files.
+
+The Ledger files that ledgertools writes are only ever appended to.
+For each file the cache keeps a ``rollup.Rollup`` of the totals of
+the accounts in it by day, month and financial year, the offset they
+were read up to, and a checksum of the bytes just before that offset.
+While the file still holds those bytes there, only what has been
+appended since is read.
+"""
+
+import cPickle as pickle
+import hashlib
+import os
+
+from . import journal
+from . import rollup
+from . import util
+
+# bump whenever the cache file format changes
+VERSION = 2
+
+# the number of bytes before the offset that must be unchanged
+TAIL = 4096
+
+
+def entries_end(data):
+    """Return the offset just past the last blank line in data.
+
+    Entries before the offset are complete; the last entry after it
+    might yet have postings appended.
+    """
+    i = data.rfind('\n\n')
+    return i + 2 if i >= 0 else 0
+
+
+def add_postings(totals, data):
+    """Add the postings of the journal text data to a rollup."""
+    for x in journal.read(data.splitlines(True)):
+        totals.add_xn(x)
+
+
+class BalanceCache(object):
+    """Totals of the accounts in Ledger files, updated incrementally."""
+    def __init__(self, dir):
+        """Initialise the cache.
+
+        ``dir``
+          The cache directory, which is created when first needed.
+          If None, files are always read in full.
+        """
+        self.dir = dir
+
+    def _cachefile(self, path):
+        return os.path.join(
+            self.dir,
+            hashlib.sha1(path).hexdigest() + '.balance'
+        )
+
+    def _load(self, path):
+        """Return the ``(offset, tail, rollup)`` cached for path, or None."""
+        if self.dir is None:
+            return None
+        try:
+            with open(self._cachefile(path), 'rb') as fh:
+                key, snapshot = pickle.load(fh)
+            if key == (VERSION, path):
+                return snapshot
+        except Exception:
+            pass  # missing or corrupt cache file
+        return None
+
+    def _store(self, path, snapshot):
+        """Atomically write the cache file, ignoring any failure."""
+        if self.dir is None:
+            return
+        try:
+            util.dump_atomic(((VERSION, path), snapshot),
+                             self._cachefile(path))
+        except (IOError, OSError, pickle.PicklingError):
+            pass
+
+    def file_rollup(self, path):
+        """Return a ``rollup.Rollup`` of the postings in a Ledger file."""
+        path = os.path.abspath(path)
+        snapshot = self._load(path)
+        start, tail, totals = 0, '', rollup.Rollup()
+        with open(path, 'rb') as fh:
+            if snapshot is not None:
+                offset, checksum, cached = snapshot
+                fh.seek(max(0, offset - TAIL))
+                tail = fh.read(min(offset, TAIL))
+                if len(tail) == min(offset, TAIL) \
+                        and hashlib.sha1(tail).hexdigest() == checksum:
+                    start, totals = offset, cached
+                else:
+                    tail = ''  # the file was rewritten; read it all
+            fh.seek(start)
+            data = fh.read()
+
+        end = entries_end(data)
+        try:
+            add_postings(totals, data[:end])
+            if end:
+                tail = (tail + data[:end])[-TAIL:]
+                self._store(path, (
+                    start + end,
+                    hashlib.sha1(tail).hexdigest(),
+                    totals
+                ))
+            add_postings(totals, data[end:])  # not yet cached
+        except journal.JournalError as e:
+            raise journal.JournalError(
+                '{} (from byte {}): {}'.format(path, start, e)
+                if start else '{}: {}'.format(path, e)
+            )
+        return totals
+
+    def rollup(self, paths):
+        """Return a ``rollup.Rollup`` of the postings in Ledger files."""
+        totals = rollup.Rollup()
+        for path in paths:
+            totals.update(self.file_rollup(path))
+        return totals
+
+    def totals(self, paths):
+        """Return a dict of the totals of the accounts in Ledger files."""
+        return self.rollup(paths).totals()
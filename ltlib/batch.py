@@ -0,0 +1,350 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Columnar transaction batches, for matching rules in bulk.
+
+This module requires NumPy.
+"""
+
+import datetime
+import decimal
+import itertools
+
+import numpy
+
+from . import index
+from . import parallel
+from . import rule
+from . import xn as xnlib
+
+BATCH_SIZE = 65536
+
+# amounts are held as integers scaled by 10 ** scale, where the scale
+# is the most decimal places in the batch, up to MAX_SCALE
+MAX_SCALE = 6
+LIMIT = 10 ** 18  # scaled amounts are smaller than this in magnitude
+EXACT = decimal.Context(prec=100)
+
+def clip(n):
+    return max(-LIMIT, min(n, LIMIT))
+
+
+class XnBatch(object):
+    """Columnar view of a sequence of transactions.
+
+    ``dates`` holds date ordinals and ``amounts`` holds amounts scaled
+    by ``10 ** scale``, for the rows flagged in ``exact_dates`` and
+    ``exact_amounts``.  Other rows, with a missing value or one that
+    cannot be represented exactly, are left to the conditions' own
+    ``match`` methods.
+
+    Descriptions and accounts are interned.  ``desc_ids`` holds the
+    index into ``descs`` of each row's description, or -1 for none.
+    ``src_rows`` and ``src_accounts`` hold the row and the index into
+    ``accounts`` of every source endpoint; likewise for destinations.
+    """
+    def __init__(self, xns):
+        self.xns = list(xns)
+        self.n = len(self.xns)
+
+        dates = [x.date for x in self.xns]
+        self.exact_dates = numpy.array(
+            [type(d) is datetime.date for d in dates], dtype=bool
+        )
+        self.dates = numpy.array(
+            [d.toordinal() if type(d) is datetime.date else 0 for d in dates],
+            dtype=numpy.int64
+        )
+
+        amounts = [x.amount for x in self.xns]
+        places = [
+            -a.as_tuple().exponent
+            if isinstance(a, decimal.Decimal) and a.is_finite() else None
+            for a in amounts
+        ]
+        self.scale = min(
+            MAX_SCALE,
+            max([0] + [p for p in places if p is not None])
+        )
+        exact = [
+            p is not None and p <= self.scale
+            and a.adjusted() + self.scale < 18
+            for a, p in zip(amounts, places)
+        ]
+        self.exact_amounts = numpy.array(exact, dtype=bool)
+        self.amounts = numpy.array(
+            [
+                int(a.scaleb(self.scale, EXACT)) if ok else 0
+                for a, ok in zip(amounts, exact)
+            ],
+            dtype=numpy.int64
+        )
+
+        self.descs = []
+        ids = {}
+        desc_ids = []
+        for x in self.xns:
+            if x.desc is None:
+                desc_ids.append(-1)
+                continue
+            if x.desc not in ids:
+                ids[x.desc] = len(self.descs)
+                self.descs.append(x.desc)
+            desc_ids.append(ids[x.desc])
+        self.desc_ids = numpy.array(desc_ids, dtype=numpy.intp)
+
+        self.accounts = []
+        ids = {}
+        endpoints = {'src': ([], []), 'dst': ([], [])}
+        for i, x in enumerate(self.xns):
+            for field, (rows, accounts) in endpoints.viewitems():
+                for ep in getattr(x, field) or ():
+                    if ep.account not in ids:
+                        ids[ep.account] = len(self.accounts)
+                        self.accounts.append(ep.account)
+                    rows.append(i)
+                    accounts.append(ids[ep.account])
+        self.src_rows, self.src_accounts = (
+            numpy.array(a, dtype=numpy.intp) for a in endpoints['src']
+        )
+        self.dst_rows, self.dst_accounts = (
+            numpy.array(a, dtype=numpy.intp) for a in endpoints['dst']
+        )
+
+    def __len__(self):
+        return self.n
+
+    def scalar_mask(self, condition, rows):
+        """Return the mask of the given rows that satisfy condition.
+
+        The condition's own ``match`` method is called for each row.
+        """
+        mask = numpy.zeros(self.n, dtype=bool)
+        for i in numpy.flatnonzero(rows):
+            mask[i] = bool(condition.match(self.xns[i]))
+        return mask
+
+    def amount_regions(self, table):
+        """Return the ``Regions`` of amounts in an ``index.IntervalTable``.
+
+        The bounds of the table are scaled like the amounts; a bound
+        with more decimal places lies strictly between two scaled
+        amounts, so it is enough to know its floor.
+        """
+        floors, integral = [], []
+        for p in table.points:
+            scaled = p.scaleb(self.scale, EXACT)
+            floor = scaled.to_integral_value(decimal.ROUND_FLOOR)
+            floors.append(clip(int(floor)))
+            integral.append(scaled == floor)
+        return Regions(table, self.amounts, self.exact_amounts,
+                       floors, integral)
+
+    def date_regions(self, table):
+        """Return the ``Regions`` of dates in an ``index.IntervalTable``."""
+        return Regions(table, self.dates, self.exact_dates,
+                       [p.toordinal() for p in table.points],
+                       [True] * len(table.points))
+
+    def interval_mask(self, regions, intervals, conditions, rows):
+        """Return the mask of the given rows within intervals.
+
+        ``intervals`` is what ``index.interval_set`` made of
+        ``conditions``, which are checked one by one for the rows that
+        ``regions`` could not place.
+        """
+        mask = regions.mask(intervals)
+        inexact = rows & ~regions.exact
+        for c in conditions:
+            inexact &= self.scalar_mask(c, inexact)
+        return mask | inexact
+
+    def description_masks(self, conditions):
+        """Return a dict of masks of description conditions, by key.
+
+        ``conditions`` is a sequence of ``(key, condition)`` pairs.
+        Each distinct description is matched against every condition
+        at once by an ``index.DescriptionMatcher``.
+        """
+        conditions = list(conditions)
+        matcher = index.DescriptionMatcher(
+            (key, c.value) for key, c in conditions
+        )
+        hits = dict((key, []) for key, c in conditions)
+        for i, desc in enumerate(self.descs):
+            for key in matcher.match(desc):
+                hits[key].append(i)
+        masks = {}
+        for key, ids in hits.viewitems():
+            found = numpy.zeros(len(self.descs) + 1, dtype=bool)
+            found[ids] = True  # the extra False is for desc_ids of -1
+            masks[key] = found[self.desc_ids]
+        return masks
+
+    def account_masks(self, conditions, ep_rows, ep_accounts):
+        """Return a dict of masks of account conditions, by key.
+
+        ``conditions`` is a sequence of ``(key, condition)`` pairs, and
+        ``ep_rows`` and ``ep_accounts`` give the endpoints to look at.
+        Each distinct account is looked up once in an
+        ``index.AccountTrie``.
+        """
+        conditions = list(conditions)
+        trie = index.AccountTrie(conditions)
+        hits = dict((key, []) for key, c in conditions)
+        for i, account in enumerate(self.accounts):
+            if isinstance(account, basestring):
+                keys = trie.match(account)
+            else:
+                keys = [k for k, c in conditions if c.re.search(account)]
+            for key in keys:
+                hits[key].append(i)
+        masks = {}
+        for key, ids in hits.viewitems():
+            found = numpy.zeros(len(self.accounts), dtype=bool)
+            found[ids] = True
+            mask = numpy.zeros(self.n, dtype=bool)
+            mask[ep_rows[found[ep_accounts]]] = True
+            masks[key] = mask
+        return masks
+
+    def match_rules(self, rules):
+        """Match every transaction against the given ruleset.
+
+        ``rules`` is a sequence of rules or an ``index.RuleIndex``.
+        Return a list of the results of ``Xn.match_rules`` for each
+        transaction, in order.
+
+        Description and account conditions are matched for every row at
+        once, so ``Rule.order`` only decides the order of the conditions
+        that are checked one row at a time.
+        """
+        results = []
+        for x in self.xns:
+            try:
+                x.check()
+                results.append(None)  # complete; not matched
+            except xnlib.XnDataError:
+                results.append({})
+        rows = numpy.array([r is not None for r in results], dtype=bool)
+
+        rules = list(rules)
+        conditions = list(enumerate(c for r in rules for c in r.conditions))
+        masks = self.description_masks(
+            (k, c) for k, c in conditions
+            if isinstance(c, rule.DescriptionCondition)
+        )
+        masks.update(self.account_masks(
+            ((k, c) for k, c in conditions
+                if isinstance(c, rule.SourceCondition)),
+            self.src_rows, self.src_accounts
+        ))
+        masks.update(self.account_masks(
+            ((k, c) for k, c in conditions
+                if isinstance(c, rule.DestinationCondition)),
+            self.dst_rows, self.dst_accounts
+        ))
+
+        amounts = [index.interval_set(r, rule.AmountCondition) for r in rules]
+        dates = [index.interval_set(r, rule.DateCondition) for r in rules]
+        amount_regions = self.amount_regions(index.IntervalTable(
+            (i, s) for i, s in enumerate(amounts) if s is not None
+        ))
+        date_regions = self.date_regions(index.IntervalTable(
+            (i, s) for i, s in enumerate(dates) if s is not None
+        ))
+
+        offset = 0
+        for i, r in enumerate(rules):
+            mask = rows.copy()
+            keys = dict(
+                (id(c), offset + j) for j, c in enumerate(r.conditions)
+            )
+            offset += len(r.conditions)
+            tables = []
+            if amounts[i] is not None:
+                tables.append(
+                    (rule.AmountCondition, amount_regions, amounts[i], [])
+                )
+            if dates[i] is not None:
+                tables.append(
+                    (rule.DateCondition, date_regions, dates[i], [])
+                )
+            # conditions left to their own match methods are checked in
+            # the rule's order, each for the rows that passed the others
+            for c in r.order:
+                key = keys[id(c)]
+                if key in masks:
+                    mask &= masks[key]
+                    continue
+                for cls, regions, intervals, conditions in tables:
+                    if isinstance(c, cls):
+                        conditions.append(c)
+                        break
+                else:
+                    mask &= self.scalar_mask(c, mask)
+            for cls, regions, intervals, conditions in tables:
+                mask &= self.interval_mask(
+                    regions, intervals, conditions, mask
+                )
+            if r.grouped:
+                for j in numpy.flatnonzero(mask):
+                    xnlib.add_outcomes(results[j], r.grouped)
+        return results
+
+
+class Regions(object):
+    """The rows of a batch, grouped by region of an interval table.
+
+    ``values`` are the rows' values, on the same scale as ``floors``,
+    the floors of the bounds of ``table``; ``integral`` tells which
+    bounds are exactly their floor.  Only the rows flagged in
+    ``exact`` are placed.
+    """
+    def __init__(self, table, values, exact, floors, integral):
+        self.table = table
+        self.exact = exact
+        floors = numpy.array(floors, dtype=numpy.int64)
+        integral = numpy.array(integral, dtype=bool)
+        j = numpy.searchsorted(floors, values)
+        ids = 2 * j
+        if len(floors):
+            k = numpy.minimum(j, len(floors) - 1)
+            ids += (j < len(floors)) & (floors[k] == values) & integral[k]
+        ids[~exact] = -1
+        self.order = numpy.argsort(ids, kind='mergesort')
+        self.bounds = numpy.searchsorted(
+            ids[self.order], numpy.arange(len(table.regions) + 1)
+        )
+
+    def mask(self, intervals):
+        """Return the mask of the placed rows within intervals."""
+        mask = numpy.zeros(len(self.exact), dtype=bool)
+        for interval in intervals:
+            first, stop = self.table.span(interval)
+            mask[self.order[self.bounds[first]:self.bounds[stop]]] = True
+        return mask
+
+
+def match_rules(xns, rules, size=BATCH_SIZE):
+    """Match transactions against rules a batch at a time.
+
+    Generates ``(xn, scores)`` in the order of ``xns``, where scores is
+    the result of ``xn.match_rules(rules)``.
+    """
+    for chunk in parallel.chunks(xns, size):
+        for pair in itertools.izip(chunk, XnBatch(chunk).match_rules(rules)):
+            yield pair
@@ -30,6 +30,33 @@ def apply(filter):
     return decorator
 
 
+def memoise(method):
+    """Decorate a method so that it is called once per set of arguments.
+
+    The results are remembered on the instance.
+    """
+    name = '_memo_' + method.__name__
+
+    def wrapper(self, *args, **kwargs):
+        memo = self.__dict__.setdefault(name, {})
+        key = (args, tuple(sorted(kwargs.iteritems())))
+        if key not in memo:
+            memo[key] = method(self, *args, **kwargs)
+        return memo[key]
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+def fy(date):
+    """Return the financial year of a date.
+
+    A financial year runs from 1 July to 30 June, and is known by the
+    year in which it ends.
+    """
+    return date.year if date.month < 7 else date.year + 1
+
+
 def format_outpat(outpat, xn):
     """
     Format an outpat for the given transaction.
@@ -55,11 +82,34 @@ def format_outpat(outpat, xn):
     return outpat.format(
         year=str(xn.date.year),
         month='{:02}'.format(xn.date.month),
-        fy=str(xn.date.year if xn.date.month < 7 else xn.date.year + 1),
+        fy=str(fy(xn.date)),
         date=xn.date
     )
 
 
+class _Wildcard(object):
+    """Format field that stands for any value in a glob pattern."""
+    def __getattr__(self, name):
+        return self
+
+    def __getitem__(self, key):
+        return self
+
+    def __format__(self, spec):
+        return '*'
+
+
+def outpat_glob(outpat):
+    """Return a glob pattern matching every file an outpat may name.
+
+    Each field of the outpat, formatted as by ``format_outpat``, is
+    replaced by ``*``.
+    """
+    wildcard = _Wildcard()
+    return outpat.format(year=wildcard, month=wildcard, fy=wildcard,
+                         date=wildcard)
+
+
 class Config(object):
     def __init__(self, path='~/.ltconfig', text=None):
         """Initialise a Config object.
@@ -100,11 +150,24 @@ class Config(object):
     def rootdir(self):
         return self.get('rootdir')
 
+    def cachedir(self):
+        """Return the directory for caches.
+
+        Defaults to ``'~/.cache/ledgertools'``.  Return None if the
+        ``cachedir`` config is set to a false value, which disables
+        caching.
+        """
+        cachedir = self.get('cachedir', default='~/.cache/ledgertools')
+        return os.path.normpath(os.path.expanduser(cachedir)) \
+            if cachedir else None
+
     @apply(os.path.normpath)
+    @memoise
     def outdir(self, acc=None):
         """Return the outdir for the given account.
 
-        Attempts to create the directory if it does not exist.
+        Attempts to create the directory if it does not exist.  The
+        result is remembered, so this is only done once per account.
         """
         rootdir = self.rootdir()
         outdir = self.get('outdir', acc=acc)
@@ -113,6 +176,7 @@ class Config(object):
             os.makedirs(dir)
         return dir
 
+    @memoise
     def outpat(self, acc=None):
         """
         Determine the full outfile pattern for the given account.
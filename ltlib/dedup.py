@@ -0,0 +1,153 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Detection of transactions already written to Ledger files.
+
+Each posting of a transaction is fingerprinted by its date, amount,
+account and normalised description.  A ``DedupIndex`` holds a count
+of the fingerprints in a set of Ledger files, so that each incoming
+transaction is checked with a few dict lookups, whatever the size of
+the history.  The fingerprints of each file are cached on disk and
+only recomputed when the file changes.
+"""
+
+import collections
+import cPickle as pickle
+import hashlib
+import os
+
+from . import journal
+from . import util
+
+# bump whenever fingerprints or the cache file format change
+VERSION = 1
+
+
+def normalise(desc):
+    """Normalise a description for comparison.
+
+    Case and runs of whitespace are not significant.
+    """
+    return ' '.join(desc.lower().split()) if desc else ''
+
+
+def amount_key(amount):
+    """Return a string that is the same for equal amounts.
+
+    Trailing zeros of the fraction are dropped, so ``12.50`` and
+    ``12.5`` agree.  Strings hash far faster than Decimals do.
+    """
+    s = str(amount)
+    if '.' in s and 'E' not in s:
+        s = s.rstrip('0').rstrip('.')
+    return s
+
+
+def fingerprints(x):
+    """Return the fingerprints of the postings of a transaction."""
+    desc = normalise(x.desc)
+    return [
+        (x.date, amount_key(ep.amount), ep.account, desc)
+        for ep in (x.src or []) + (x.dst or [])
+    ]
+
+
+class DedupIndex(object):
+    """Multiset of the fingerprints of transactions in Ledger files.
+
+    A transaction has been seen if each of its fingerprints is in the
+    index.  Seeing it uses up those fingerprints, so that a statement
+    with several identical transactions only has as many of them
+    skipped as the files hold.
+
+    Note that a transaction is fingerprinted by the description it was
+    written with; one whose description was rewritten by a rule is not
+    recognised.
+    """
+    def __init__(self, paths, cachedir=None):
+        """Initialise the index.
+
+        ``paths``
+          The Ledger files to index.  Missing files are ignored.
+        ``cachedir``
+          The directory in which the fingerprints of each file are
+          cached.  If None, the files are always read.
+        """
+        self.cachedir = cachedir
+        self.counts = collections.Counter()
+        self.skipped = 0
+        for path in paths:
+            self.counts.update(self._file_counts(path))
+
+    def _cachefile(self, path):
+        return os.path.join(
+            self.cachedir,
+            hashlib.sha1(path).hexdigest() + '.dedup'
+        )
+
+    def _file_counts(self, path):
+        """Return the fingerprint counts of a Ledger file."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return {}
+        path = os.path.abspath(path)
+        key = (VERSION, path, st.st_size, st.st_mtime)
+        if self.cachedir is not None:
+            cachefile = self._cachefile(path)
+            try:
+                with open(cachefile, 'rb') as fh:
+                    cached_key, counts = pickle.load(fh)
+                if cached_key == key:
+                    return counts
+            except Exception:
+                pass  # missing, stale or corrupt cache file
+
+        counts = collections.Counter()
+        for x in journal.read_path(path):
+            counts.update(fingerprints(x))
+        if self.cachedir is not None:
+            try:
+                util.dump_atomic((key, counts), cachefile)
+            except (IOError, OSError, pickle.PicklingError):
+                pass
+        return counts
+
+    def seen(self, x):
+        """Return whether x is in the index, using it up if so."""
+        wanted = {}
+        for fp in fingerprints(x):
+            wanted[fp] = wanted.get(fp, 0) + 1
+        if not wanted:
+            return False
+        counts = self.counts
+        for fp, n in wanted.iteritems():
+            if counts.get(fp, 0) < n:
+                return False
+        for fp, n in wanted.iteritems():
+            counts[fp] -= n
+        return True
+
+    def filter(self, xns):
+        """Generate the transactions that have not been seen.
+
+        ``skipped`` counts the transactions left out.
+        """
+        for x in xns:
+            if self.seen(x):
+                self.skipped += 1
+            else:
+                yield x
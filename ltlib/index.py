@@ -0,0 +1,581 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import bisect
+import datetime
+import decimal
+import operator
+import re
+import sre_constants
+import sre_parse
+
+from . import rule
+
+# characters that make an account condition something other than a
+# literal account name
+account_literal = re.compile(r'[^.^$*+?{}\[\]\\|()]*$')
+
+# shortest description literal worth indexing
+MIN_LITERAL = 3
+
+# patterns per combined regular expression; sre supports 100 groups
+MAX_GROUPS = 99
+
+# account fragment matched by the '::' wildcard of AccountCondition
+wild_fragment = re.compile(r'[\w ]+\Z')
+
+# account pattern tokens and trie edges
+LIT, COLON, WILD, ANY = 'lit', ':', '::', '*'
+
+
+def description_literal(pattern):
+    """Return the longest literal that any match of pattern must contain.
+
+    The literal is lowercased and only consists of ASCII characters, so
+    that ``literal in desc.lower()`` is a necessary condition for
+    ``pattern.search(desc)`` regardless of case-insensitivity.
+
+    Return None if no literal of at least MIN_LITERAL characters can
+    be determined.
+    """
+    if pattern.flags & re.LOCALE:
+        return None  # case folding depends on the locale
+    try:
+        items = sre_parse.parse(pattern.pattern, pattern.flags)
+    except (sre_constants.error, TypeError):
+        return None
+    best = run = ''
+    for op, av in items:
+        if op == sre_constants.LITERAL and 0x20 <= av < 0x7f:
+            run += chr(av).lower()
+        else:
+            run = ''
+        if len(run) > len(best):
+            best = run
+    return best if len(best) >= MIN_LITERAL else None
+
+
+def trigrams(s):
+    return set(s[i:i + 3] for i in xrange(len(s) - 2))
+
+
+class DescriptionMatcher(object):
+    """Match many description patterns against a description at once.
+
+    Patterns with the same flags are combined into one expression of
+    optional lookaheads, each of which captures wherever its pattern
+    matches the description.  A single ``match`` call thus answers
+    ``pattern.search(desc)`` for every pattern in the group.
+
+    Patterns that have groups of their own (which may be referred to
+    by backreferences) or are verbose are searched individually.
+    """
+    def __init__(self, patterns):
+        """Initialise the matcher.
+
+        ``patterns``
+          Sequence of ``(key, pattern)`` pairs, where ``pattern`` is a
+          compiled regular expression.
+        """
+        self._combined = []  # (regex, keys)
+        self._single = []    # (pattern, key)
+        groups = {}
+        for key, pattern in patterns:
+            if pattern.groups or pattern.flags & re.VERBOSE:
+                self._single.append((pattern, key))
+            else:
+                flavour = (pattern.flags, type(pattern.pattern))
+                groups.setdefault(flavour, []).append((key, pattern))
+        for (flags, _), items in sorted(groups.viewitems()):
+            for i in xrange(0, len(items), MAX_GROUPS):
+                chunk = items[i:i + MAX_GROUPS]
+                regex = re.compile(''.join(
+                    r'(?:(?=[\s\S]*?(' + pattern.pattern + ')))?'
+                    for key, pattern in chunk
+                ), flags)
+                self._combined.append((regex, [key for key, _ in chunk]))
+
+    def match(self, desc):
+        """Return the set of keys of the patterns that match desc."""
+        hits = set()
+        if desc is None:
+            return hits
+        for regex, keys in self._combined:
+            hits.update(
+                key for key, group in zip(keys, regex.match(desc).groups())
+                if group is not None
+            )
+        hits.update(
+            key for pattern, key in self._single if pattern.search(desc)
+        )
+        return hits
+
+
+def account_elements(value):
+    """Convert an account condition value into a fragment pattern.
+
+    The pattern is a list of elements, each of which consumes whole
+    fragments of a colon-separated account name:
+
+    ``(LIT, s)``
+      one fragment equal to ``s``
+    ``(WILD, None)``
+      one or more fragments matching the '::' wildcard
+    ``(ANY, None)``
+      one or more arbitrary fragments (an unanchored end)
+
+    Return None if the value is not a literal account pattern with
+    the usual ':' and '::' punctuation; such conditions can only be
+    matched with their regular expression.
+    """
+    if not value or not account_literal.match(value):
+        return None
+    tokens = []
+    i = 0
+    while i < len(value):
+        if value.startswith('::', i):
+            tokens.append(WILD)
+            i += 2
+        elif value[i] == ':':
+            tokens.append(COLON)
+            i += 1
+        else:
+            j = value.find(':', i)
+            j = len(value) if j < 0 else j
+            tokens.append(value[i:j])
+            i = j
+    separators = (COLON, WILD)
+    if any(
+        a in separators and b in separators
+        for a, b in zip(tokens, tokens[1:])
+    ):
+        return None  # empty fragments; leave these to the regex
+    elements = [(ANY, None)] if tokens[0] in separators else []
+    for token in tokens:
+        if token is WILD:
+            elements.append((WILD, None))
+        elif token is not COLON:
+            elements.append((LIT, token))
+    if tokens[-1] in separators:
+        elements.append((ANY, None))
+    return elements
+
+
+class TrieNode(object):
+    __slots__ = ['lits', 'wild', 'any', 'loop', 'keys']
+
+    def __init__(self, loop=None):
+        self.lits = {}
+        self.wild = None
+        self.any = None
+        self.loop = loop  # edge kind this node may consume repeatedly
+        self.keys = []
+
+
+class AccountTrie(object):
+    """Answer which account conditions match an account in one walk.
+
+    Account conditions are compiled into a trie over account
+    fragments, with wildcard edges for '::' and the unanchored ends of
+    a pattern.  Walking the trie with the fragments of an account
+    yields every condition whose regular expression would match it.
+    Conditions that are not plain account patterns fall back to their
+    regular expression.
+
+    Results are cached per account, since statements reuse a small
+    set of accounts over and over.
+    """
+    def __init__(self, conditions):
+        """Initialise the trie.
+
+        ``conditions``
+          Sequence of ``(key, condition)`` pairs, where ``condition``
+          is a ``rule.AccountCondition``.
+        """
+        self.root = TrieNode()
+        self._conditions = []  # (key, regex) of every condition
+        self._fallback = []    # (key, regex) not representable in trie
+        self._cache = {}
+        for key, condition in conditions:
+            self._conditions.append((key, condition.re))
+            elements = account_elements(condition.value)
+            if elements is None:
+                self._fallback.append((key, condition.re))
+            else:
+                self._insert(elements, key)
+
+    def _insert(self, elements, key):
+        node = self.root
+        for kind, value in elements:
+            if kind is LIT:
+                if value not in node.lits:
+                    node.lits[value] = TrieNode()
+                node = node.lits[value]
+            elif kind is WILD:
+                if node.wild is None:
+                    node.wild = TrieNode(loop=WILD)
+                node = node.wild
+            else:
+                if node.any is None:
+                    node.any = TrieNode(loop=ANY)
+                node = node.any
+        node.keys.append(key)
+
+    def match(self, account):
+        """Return the frozenset of keys of conditions matching account."""
+        try:
+            return self._cache[account]
+        except KeyError:
+            pass
+        if account.endswith('\n'):
+            # '$' also matches before a trailing newline
+            hits = frozenset(
+                key for key, regex in self._conditions
+                if regex.search(account)
+            )
+        else:
+            hits = frozenset(self._walk(account.split(':'))).union(
+                key for key, regex in self._fallback
+                if regex.search(account)
+            )
+        self._cache[account] = hits
+        return hits
+
+    def _walk(self, fragments):
+        states = set([self.root])
+        for fragment in fragments:
+            wild = wild_fragment.match(fragment)
+            following = set()
+            for node in states:
+                if fragment in node.lits:
+                    following.add(node.lits[fragment])
+                if node.wild is not None and wild:
+                    following.add(node.wild)
+                if node.any is not None:
+                    following.add(node.any)
+                if node.loop is ANY or node.loop is WILD and wild:
+                    following.add(node)
+            states = following
+            if not states:
+                return ()
+        return (key for node in states for key in node.keys)
+
+
+# the set of values satisfying ``op(value, bound)``, as intervals
+# ``(lo, lo_closed, hi, hi_closed)``, where an unbounded end is None
+comparison_intervals = {
+    operator.lt: lambda v: [(None, False, v, False)],
+    operator.le: lambda v: [(None, False, v, True)],
+    operator.eq: lambda v: [(v, True, v, True)],
+    operator.ne: lambda v: [(None, False, v, False), (v, False, None, False)],
+    operator.ge: lambda v: [(v, True, None, False)],
+    operator.gt: lambda v: [(v, False, None, False)],
+}
+
+
+def orderable(value):
+    """Return True if value can be a bound in an IntervalTable."""
+    if isinstance(value, decimal.Decimal):
+        return value.is_finite()
+    return type(value) is datetime.date
+
+
+def intersect(a, b):
+    """Return the intersection of two intervals, or None if empty."""
+    lo, lo_closed = a[:2]
+    if lo is None or b[0] is not None and b[0] > lo:
+        lo, lo_closed = b[:2]
+    elif b[0] == lo:
+        lo_closed = lo_closed and b[1]
+    hi, hi_closed = a[2:]
+    if hi is None or b[2] is not None and b[2] < hi:
+        hi, hi_closed = b[2:]
+    elif b[2] == hi:
+        hi_closed = hi_closed and b[3]
+    if lo is not None and hi is not None and (
+            lo > hi or lo == hi and not (lo_closed and hi_closed)):
+        return None
+    return lo, lo_closed, hi, hi_closed
+
+
+def interval_set(r, cls):
+    """Return the values allowed by a rule's conditions of class cls.
+
+    ``cls`` is ``rule.AmountCondition`` or ``rule.DateCondition``.  The
+    values are returned as a list of disjoint intervals, which is empty
+    if no value satisfies every condition.  Return None if the rule has
+    no such conditions, or if any of them cannot be represented.
+    """
+    intervals = None
+    for c in r.conditions:
+        if not isinstance(c, cls):
+            continue
+        if c.op not in comparison_intervals or not orderable(c.value):
+            return None
+        allowed = comparison_intervals[c.op](c.value)
+        if intervals is None:
+            intervals = allowed
+        else:
+            intervals = filter(None, (
+                intersect(a, b) for a in intervals for b in allowed
+            ))
+    return intervals
+
+
+class IntervalTable(object):
+    """Find which of many interval sets contain a value, by bisection.
+
+    The bounds of all the intervals divide the values into elementary
+    regions: each bound is a region, as is each gap between adjacent
+    bounds (and before the first and after the last).  Every value in
+    a region is in the same sets, so ``lookup`` need only find the
+    region of a value.
+
+    Region ``2 * i + 1`` is ``points[i]``, and region ``2 * i`` is the
+    gap before it; ``regions`` holds the keys of the sets containing
+    each region.
+    """
+    def __init__(self, sets):
+        """Initialise the table.
+
+        ``sets``
+          Sequence of ``(key, intervals)`` pairs, where ``intervals``
+          is a list of intervals as returned by ``interval_set``.
+        """
+        sets = list(sets)
+        self.keys = [key for key, intervals in sets]
+        self.points = sorted(set(
+            bound
+            for key, intervals in sets
+            for lo, lo_closed, hi, hi_closed in intervals
+            for bound in (lo, hi)
+            if bound is not None
+        ))
+        self._position = dict((p, i) for i, p in enumerate(self.points))
+        starts = [[] for _ in xrange(2 * len(self.points) + 2)]
+        for key, intervals in sets:
+            for interval in intervals:
+                first, stop = self.span(interval)
+                starts[first].append((key, 1))
+                starts[stop].append((key, -1))
+        self.regions = []
+        active = {}
+        keys = ()
+        for changes in starts[:-1]:
+            if changes:
+                for key, change in changes:
+                    active[key] = active.get(key, 0) + change
+                    if not active[key]:
+                        del active[key]
+                keys = tuple(sorted(active))
+            self.regions.append(keys)
+
+    def span(self, interval):
+        """Return ``(first, stop)``, the range of regions in interval."""
+        lo, lo_closed, hi, hi_closed = interval
+        if lo is None:
+            first = 0
+        else:
+            first = 2 * self._position[lo] + (1 if lo_closed else 2)
+        if hi is None:
+            stop = 2 * len(self.points) + 1
+        else:
+            stop = 2 * self._position[hi] + (2 if hi_closed else 1)
+        return first, stop
+
+    def region(self, value):
+        """Return the index of the region containing value."""
+        i = bisect.bisect_left(self.points, value)
+        if i < len(self.points) and self.points[i] == value:
+            return 2 * i + 1
+        return 2 * i
+
+    def lookup(self, value):
+        """Return the keys of the sets containing value.
+
+        If value cannot be compared with the bounds, every key is
+        returned, so that the caller's own comparison decides.
+        """
+        if not orderable(value):
+            return self.keys
+        try:
+            return self.regions[self.region(value)]
+        except TypeError:
+            return self.keys
+
+
+class RuleIndex(object):
+    """Compiled ruleset that only offers each transaction candidate rules.
+
+    Every rule is filed in a single bucket according to its most
+    selective indexable condition:
+
+    - an ``eq`` amount condition;
+    - a literal that descriptions must contain (bucketed by trigram);
+    - any other description pattern (found by a ``DescriptionMatcher``);
+    - a ``from`` or ``to`` account condition (found by an
+      ``AccountTrie``);
+    - any other amount conditions;
+    - date conditions;
+    - otherwise the rule is a candidate for every transaction.
+
+    The amount and date conditions of a rule are reduced to the set of
+    values they allow, and those of all rules are looked up at once in
+    an ``IntervalTable``.
+
+    Membership of a bucket is a necessary, not sufficient, condition
+    for a rule to match, so each candidate is still checked with
+    ``Rule.match``.  Candidates are produced in ruleset order, hence
+    ``Xn.match_rules`` gives the same result as with the plain list.
+
+    Except for the description literal, a bucket answers the
+    conditions it was filed by exactly, and ``matching`` does not
+    check those again.
+    """
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self._desc = {}
+        self._src = []        # (index, condition) for AccountTrie
+        self._dst = []
+        self._amounts = []    # (index, intervals) for IntervalTable
+        self._dates = []
+        self._always = []
+        self._patterns = []   # (index, pattern) for DescriptionMatcher
+        self._answered = {}   # index -> (cls, conditions) of its bucket
+        for i, r in enumerate(self.rules):
+            self._add(i, r)
+        self._matcher = DescriptionMatcher(self._patterns)
+        self._src_trie = AccountTrie(self._src)
+        self._dst_trie = AccountTrie(self._dst)
+        self._amount_table = IntervalTable(self._amounts)
+        self._date_table = IntervalTable(self._dates)
+
+    def __iter__(self):
+        return iter(self.rules)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def _add(self, i, r):
+        conditions = r.conditions
+        amounts = interval_set(r, rule.AmountCondition)
+
+        if amounts is not None and any(
+                isinstance(c, rule.AmountCondition) and c.op is operator.eq
+                for c in conditions):
+            self._amounts.append((i, amounts))
+            self._answer(i, r, rule.AmountCondition)
+            return
+
+        for c in conditions:
+            if isinstance(c, rule.DescriptionCondition):
+                literal = description_literal(c.value)
+                if literal:
+                    key = min(
+                        trigrams(literal),
+                        key=lambda x: (len(self._desc.get(x, ())), x)
+                    )
+                    self._desc.setdefault(key, []).append(i)
+                    return
+
+        for c in conditions:
+            if isinstance(c, rule.DescriptionCondition):
+                self._patterns.append((i, c.value))
+                self._answered[i] = (None, frozenset([c]))
+                return
+
+        for c in conditions:
+            if isinstance(c, rule.SourceCondition):
+                self._src.append((i, c))
+                self._answered[i] = (None, frozenset([c]))
+                return
+            elif isinstance(c, rule.DestinationCondition):
+                self._dst.append((i, c))
+                self._answered[i] = (None, frozenset([c]))
+                return
+
+        if amounts is not None:
+            self._amounts.append((i, amounts))
+            self._answer(i, r, rule.AmountCondition)
+            return
+
+        dates = interval_set(r, rule.DateCondition)
+        if dates is not None:
+            self._dates.append((i, dates))
+            self._answer(i, r, rule.DateCondition)
+            return
+
+        self._always.append(i)
+
+    def _answer(self, i, r, cls):
+        """Note that an interval table answers r's conditions of cls."""
+        self._answered[i] = (
+            cls, frozenset(c for c in r.conditions if isinstance(c, cls))
+        )
+
+    def candidates(self, xn):
+        """Return the candidate rules for a transaction, in ruleset order."""
+        rules = self.rules
+        return [rules[i] for i in self._candidates(xn)]
+
+    def _candidates(self, xn):
+        """Return the indices of the candidate rules, in order."""
+        candidates = set(self._always)
+
+        if xn.amount is not None:
+            candidates.update(self._amount_table.lookup(xn.amount))
+        if xn.date is not None:
+            candidates.update(self._date_table.lookup(xn.date))
+        if xn.desc is not None:
+            desc = self._desc
+            for t in trigrams(xn.desc.lower()):
+                if t in desc:
+                    candidates.update(desc[t])
+            candidates.update(self._matcher.match(xn.desc))
+
+        for ep in xn.src or ():
+            candidates.update(self._src_trie.match(ep.account))
+        for ep in xn.dst or ():
+            candidates.update(self._dst_trie.match(ep.account))
+
+        return sorted(candidates)
+
+    def matching(self, xn):
+        """Generate the rules matching the transaction, in ruleset order.
+
+        Each candidate is checked with ``Rule.match``, skipping the
+        conditions its bucket has answered.  The interval tables only
+        answer for amounts and dates they can place exactly.
+        """
+        rules = self.rules
+        answered = self._answered
+        exact = {
+            rule.AmountCondition: orderable(xn.amount),
+            rule.DateCondition: orderable(xn.date),
+        }
+        nothing = (None, ())
+        for i in self._candidates(xn):
+            r = rules[i]
+            cls, skip = answered.get(i, nothing)
+            if cls is not None and not exact[cls]:
+                skip = ()
+            if r.match(xn, skip):
+                yield r
+
+    def match(self, xn):
+        """Generate the outcomes of each rule matching the transaction."""
+        for r in self.matching(xn):
+            yield r.outcomes
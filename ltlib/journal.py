@@ -0,0 +1,161 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Reader of Ledger journal files.
+
+Reads the subset of the Ledger journal format that ``Xn.ledger``
+writes, and that is common in hand-written journals: an entry is a
+line beginning with a date, followed by indented postings of an
+account and an optional dollar amount separated by at least two
+spaces or a tab.  A single posting without an amount balances the
+entry.  Comments, and directives and other lines outside entries, are
+skipped.
+"""
+
+import datetime
+import decimal
+import itertools
+import re
+
+from . import xn
+
+entry_pattern = re.compile(
+    r'(\d{4})[/-](\d{1,2})[/-](\d{1,2})(?:=\S+)?'  # date, effective date
+    r'(?:\s+[*!])?(?:\s+\([^)]*\))?'              # state, code
+    r'(?:\s+(.*?))?\s*$'                            # description
+)
+posting_pattern = re.compile(
+    r'[ \t]+[*!]?\s*([^;\s](?:.*?[^\s])??)'  # account
+    r'(?:(?:\t|  )\s*([^;\s][^;]*?))?'       # amount
+    r'\s*(?:;.*)?$'
+)
+amount_chars = re.compile(r'[\s$,]')
+
+
+class JournalError(Exception):
+    """A journal entry could not be read"""
+    pass
+
+
+def parse_amount(s):
+    """Parse a dollar amount, such as ``$-12.50`` or ``-$1,000``."""
+    try:
+        return decimal.Decimal(amount_chars.sub('', s))
+    except decimal.InvalidOperation:
+        raise JournalError('Bad amount: {!r}'.format(s))
+
+
+def entry_to_xn(date, desc, postings):
+    """Make a transaction of a journal entry.
+
+    ``postings`` is a list of ``(account, amount)``, where at most one
+    amount may be None.  Postings with negative amounts are sources,
+    and the rest destinations; ``$-0`` counts as negative.
+    """
+    missing = [i for i, (account, amount) in enumerate(postings)
+               if amount is None]
+    if len(missing) > 1:
+        raise JournalError('More than one posting without an amount')
+    if missing:
+        i = missing[0]
+        postings[i] = (
+            postings[i][0],
+            -sum(
+                (amount for account, amount in postings if amount is not None),
+                decimal.Decimal(0)
+            )
+        )
+    src, dst = [], []
+    for account, amount in postings:
+        (src if amount.is_signed() else dst).append(
+            xn.Endpoint(account, amount)
+        )
+    return xn.Xn(
+        date=date,
+        desc=desc,
+        amount=dst[0].amount if len(dst) == 1 else sum(
+            (ep.amount for ep in dst), decimal.Decimal(0)
+        ),
+        src=src,
+        dst=dst,
+    )
+
+
+def read(lines):
+    """Generate the transactions of a journal, an iterable of lines.
+
+    Raises JournalError, with the line number, for an entry that cannot
+    be read.
+    """
+    entry = None  # (lineno, date, desc, postings)
+    for lineno, line in enumerate(itertools.chain(lines, ['']), 1):
+        if line[:1] in (' ', '\t') and entry is not None:
+            if not line.strip() or line.lstrip()[:1] == ';':
+                continue  # blank or comment line within the entry
+            match = posting_pattern.match(line)
+            if match is None:
+                raise JournalError('line {}: bad posting'.format(lineno))
+            account, amount = match.groups()
+            try:
+                amount = parse_amount(amount) if amount else None
+            except JournalError as e:
+                raise JournalError('line {}: {}'.format(lineno, e))
+            entry[3].append((account, amount))
+            continue
+
+        if entry is not None:
+            start, date, desc, postings = entry
+            entry = None
+            try:
+                yield entry_to_xn(date, desc, postings)
+            except JournalError as e:
+                raise JournalError('line {}: {}'.format(start, e))
+
+        match = entry_pattern.match(line)
+        if match is not None:
+            year, month, day, desc = match.groups()
+            try:
+                date = datetime.date(int(year), int(month), int(day))
+            except ValueError:
+                raise JournalError('line {}: bad date'.format(lineno))
+            entry = (lineno, date, desc or '', [])
+
+
+def read_path(path):
+    """Generate the transactions of the journal file at path.
+
+    The path is given in any JournalError raised.
+    """
+    with open(path) as fh:
+        try:
+            for x in read(fh):
+                yield x
+        except JournalError as e:
+            raise JournalError('{}: {}'.format(path, e))
+
+
+def select(accounts, patterns=None):
+    """Return the accounts that match any of the given patterns.
+
+    Patterns are regular expressions matched as ``ledger`` matches
+    them: anywhere in the name, ignoring case.  All the accounts are
+    returned if there are no patterns.
+    """
+    if not patterns:
+        return list(accounts)
+    res = [re.compile(p, re.I) for p in patterns]
+    return [a for a in accounts if any(r.search(a) for r in res)]
+
@@ -0,0 +1,122 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import itertools
+import multiprocessing
+
+_rules = None  # ruleset of a worker process
+_reader = None  # statement reader of a worker process
+
+
+def _init(rules, reader=None):
+    global _rules, _reader
+    _rules = rules
+    _reader = reader
+
+
+def _match_rules(xn):
+    return xn.match_rules(_rules)
+
+
+def _match_span(span):
+    xns, error = _reader.read_span(*span)
+    return [(xn, xn.match_rules(_rules)) for xn in xns], error
+
+
+def chunks(iterable, size):
+    """Generate lists of up to size consecutive items of iterable."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def ordered_map(pool, func, iterable, chunksize, batchsize):
+    """Generate ``(item, func(item))`` for each item, in order.
+
+    Items are submitted to the pool a batch at a time.  The next batch
+    is computed while the results of the current batch are being
+    consumed, so at most two batches are held in memory, however large
+    the iterable is.
+    """
+    pending = None
+    for batch in chunks(iterable, batchsize):
+        result = pool.map_async(func, batch, chunksize)
+        if pending is not None:
+            for pair in itertools.izip(pending[0], pending[1].get()):
+                yield pair
+        pending = (batch, result)
+    if pending is not None:
+        for pair in itertools.izip(pending[0], pending[1].get()):
+            yield pair
+
+
+def map_pairs(
+        func, iterable, processes=None, chunksize=1, batchsize=None,
+        initializer=None, initargs=()):
+    """Generate ``(item, func(item))`` in order, using a pool of processes.
+
+    ``processes`` defaults to the number of CPUs, and ``batchsize`` to
+    four chunks per process; see ``ordered_map``.  The pool is created
+    when the first item is needed and is shut down when the generator
+    is exhausted or closed.
+    """
+    processes = processes or multiprocessing.cpu_count()
+    batchsize = batchsize or chunksize * processes * 4
+    pool = multiprocessing.Pool(processes, initializer, initargs)
+    try:
+        for pair in ordered_map(pool, func, iterable, chunksize, batchsize):
+            yield pair
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def match_rules(xns, rules, processes=None, chunksize=64):
+    """Match transactions against rules in a pool of processes.
+
+    Generates ``(xn, scores)`` in the order of ``xns``, where scores is
+    the result of ``xn.match_rules(rules)``.  Each worker receives the
+    ruleset once, when it starts.  ``processes`` defaults to the number
+    of CPUs.
+    """
+    return map_pairs(
+        _match_rules, xns, processes, chunksize,
+        initializer=_init, initargs=(rules,)
+    )
+
+
+def match_spans(reader, rules, processes=None):
+    """Read and match the transactions of a mapped statement reader.
+
+    Each worker process inherits ``reader`` (see ``readers.MappedCSV``)
+    and reads and matches whole spans of the statement, so transactions
+    are only transferred once.  Generates ``(xn, scores)`` in the order
+    of the reader.  An error raised while reading is raised after the
+    transactions that precede it.
+    """
+    processes = processes or multiprocessing.cpu_count()
+    for span, (pairs, error) in map_pairs(
+        _match_span, reader.ordered_spans(), processes,
+        batchsize=processes, initializer=_init, initargs=(rules, reader)
+    ):
+        for pair in pairs:
+            yield pair
+        if error is not None:
+            raise error
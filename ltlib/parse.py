@@ -127,7 +127,20 @@ def line2rule(line):
         raise
 
 
-def file2rules(file):
+def file2rules(file, name=None):
+    """Parse the rules in file, an iterable of lines.
+
+    The ``source`` of each rule is set to ``(name, lineno)``, where
+    name defaults to the name of file, if it has one.
+    """
+    if name is None:
+        name = getattr(file, 'name', None)
     # filter out comments
     stripcomments = functools.partial(re.compile('\s*(?:#.*|$)').sub, '')
-    return map(line2rule, filter(lambda x: x, map(stripcomments, file)))
+    rules = []
+    for lineno, line in enumerate(map(stripcomments, file), 1):
+        if line:
+            r = line2rule(line)
+            r.source = (name, lineno)
+            rules.append(r)
+    return rules
@@ -17,13 +17,31 @@
 import csv
 import datetime
 import decimal
+import os
 import re
 
 from .. import reader
+from .. import util
 from .. import xn
 
 
 date_delim = re.compile('-|/')
+missing = object()  # cache lookup default
+
+
+def _ymd(match):
+    return datetime.date(*map(int, match.groups()))
+
+
+def _dmy(match):
+    return datetime.date(*map(int, reversed(match.groups())))
+
+# date layouts recognised by Reader.guess_date, as (regex, constructor)
+date_layouts = [
+    (re.compile(r'(\d{4})(\d{2})(\d{2})\Z'), _ymd),
+    (re.compile(r'(\d{4})[-/](\d+)[-/](\d+)\Z'), _ymd),
+    (re.compile(r'(\d{1,3}|\d{5,})[-/](\d+)[-/](\d{4})\Z'), _dmy),
+]
 
 
 class MetadataException(Exception):
@@ -43,6 +61,13 @@ def mkdecimal(s):
     return decimal.Decimal(s.replace(',', ''))
 
 
+def parse_amount(s):
+    """Equivalent to mkdecimal, skipping the clean-up of plain numbers."""
+    if '$' in s or ',' in s:
+        return mkdecimal(s)
+    return decimal.Decimal(s)
+
+
 class Reader(reader.Reader):
     """CSV statement reader.
 
@@ -53,7 +78,7 @@ class Reader(reader.Reader):
     an "Amount" field (which contains a positive or negative value)  or
     both "Debit" and "Credit" fields (which only contain positive values).
     The heuristic for interpreting the "Date" field is described in the
-    parse_date() documentation.
+    guess_date() documentation.
 
     If the field names do not match those above, use the
     ``fieldremap`` argument to supply a mapping of actual field
@@ -65,6 +90,15 @@ class Reader(reader.Reader):
     For a given transaction, the "to" or "from" field of the transaction object
     will be set to the given account according to whether the "Debit" or
     "Credit" field is used.
+
+    If the ``reverse`` argument is true, transactions are read from the
+    last row of the file to the first.  Seekable files are read
+    backwards in chunks, so memory use does not grow with the size of
+    the file; in this mode a record may not span multiple lines.
+
+    Parsed dates and amounts are memoised, since statements repeat the
+    same strings on many rows; ``cachesize`` bounds the number of
+    distinct strings of each kind that are remembered.
     """
 
     def __init__(
@@ -72,6 +106,8 @@ class Reader(reader.Reader):
             fieldnames=None,
             fieldremap=None,
             date_format=None,
+            reverse=False,
+            cachesize=4096,
             **kwargs):
         """
         Takes an account argument which indicates the account that was
@@ -85,9 +121,37 @@ class Reader(reader.Reader):
             raise reader.DataError('Required account field was not provided')
         self.account = kwargs.pop('account')
         super(Reader, self).__init__(**kwargs)
-        self.csvreader = csv.DictReader(self.file, fieldnames=fieldnames)
+        lines = self.file
+        if reverse:
+            if fieldnames is None:
+                fieldnames = csv.reader([self.file.readline()]).next()
+            lines = self.reverse_lines()
+        self.csvreader = csv.DictReader(lines, fieldnames=fieldnames)
         self.remap = fieldremap
         self.date_format = date_format
+        self.date_layout = None  # parser locked in by the first date
+        self.dates = util.LRUCache(cachesize)
+        self.amounts = {}  # cleared when full; misses must be cheap
+        self.cachesize = cachesize
+
+    def reverse_lines(self):
+        """Generate the remaining lines of the file, last line first."""
+        try:
+            # some streams report a position but cannot seek
+            start = self.file.tell()
+            self.file.seek(0, os.SEEK_END)
+            self.file.seek(start)
+        except (AttributeError, IOError, OSError):
+            # not seekable
+            for line in reversed(list(self.file)):
+                yield line
+            return
+        for line in util.reverse_lines(self.file, start):
+            if line.count('"') % 2:
+                raise reader.DataError(
+                    'Multi-line record cannot be read in reverse'
+                )
+            yield line
 
     def next(self):
         """Return the next transaction object.
@@ -101,6 +165,21 @@ class Reader(reader.Reader):
             return next(self)
 
     def parse_date(self, date):
+        """Parse the date and return a datetime.date object.
+
+        The layout of the first recognised date is assumed for the rest
+        of the file, falling back to ``guess_date`` for any date that
+        does not fit it.  Results are memoised.
+        """
+        parsed = self.dates.get(date, missing)
+        if parsed is missing:
+            if self.date_layout is None:
+                self.date_layout = self.date_parser(date)
+            parsed = (self.date_layout or self.guess_date)(date)
+            self.dates[date] = parsed
+        return parsed
+
+    def guess_date(self, date):
         """Parse the date and return a datetime object
 
         The heuristic for determining the date is:
@@ -139,6 +218,43 @@ class Reader(reader.Reader):
         except TypeError, ValueError:
             raise reader.DataError('Bad date format: "{}"'.format(date))
 
+    def date_parser(self, sample):
+        """Return a function that parses dates laid out like sample.
+
+        The function gives the same result as ``guess_date``, to which
+        it falls back for any date with a different layout, but only
+        has to try the one layout.  Return None if ``date_format`` is
+        set or the layout of sample is not recognised.
+        """
+        if self.date_format is not None:
+            return None
+        for regex, constructor in date_layouts:
+            if regex.match(sample):
+                break
+        else:
+            return None
+
+        def parse(date, match=regex.match):
+            m = match(date)
+            return constructor(m) if m else self.guess_date(date)
+        return parse
+
+    def amount(self, s, strict=False):
+        """Return the Decimal value of an amount string.
+
+        Dollar signs and thousands separators are accepted unless
+        ``strict`` is true.  Results are memoised.
+        """
+        if strict and ('$' in s or ',' in s):
+            return decimal.Decimal(s)  # raises InvalidOperation
+        value = self.amounts.get(s)
+        if value is None:
+            value = parse_amount(s)
+            if len(self.amounts) >= self.cachesize:
+                self.amounts.clear()
+            self.amounts[s] = value
+        return value
+
     def _fieldname(self, k):
         if self.remap is None:
             return k
@@ -164,7 +280,7 @@ class Reader(reader.Reader):
         # amount
         fieldname_amount = self._fieldname('Amount')
         if fieldname_amount in fields:
-            amount = mkdecimal(fields[fieldname_amount])
+            amount = self.amount(fields[fieldname_amount])
             xn_dict['amount'] = abs(amount)
             if amount > 0:
                 xn_dict['dst'] = [xn.Endpoint(self.account, amount)]  # credit
@@ -190,7 +306,7 @@ class Reader(reader.Reader):
                         'unable to process fields: {!r}'.format(fields)
                     )
             amount_raw = fields[fieldname_credit] or fields[fieldname_debit]
-            amount = abs(decimal.Decimal(amount_raw))
+            amount = abs(self.amount(amount_raw, strict=True))
             xn_dict['amount'] = amount
             if fields[fieldname_credit]:
                 xn_dict['dst'] = [xn.Endpoint(self.account, amount)]  # credit
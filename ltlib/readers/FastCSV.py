@@ -0,0 +1,199 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import decimal
+import itertools
+
+from .. import xn
+from . import CSV
+
+SLOW = object()  # marks rows that must go through dict_to_xn
+
+
+def magnitude_of(amount, s):
+    """Return abs(amount) without rounding to the context, if equal.
+
+    ``s`` is the string amount was parsed from.  Return None if the
+    shortcut might differ from ``abs``: for special values, or if the
+    number could have more digits than the context precision.
+    """
+    if not amount.is_finite() or len(s) >= decimal.getcontext().prec:
+        return None
+    return amount.copy_abs()
+
+
+class Reader(CSV.Reader):
+    """CSV statement reader optimised for large files.
+
+    Takes the same arguments, and produces the same transactions, as
+    the CSV reader.  Column positions are resolved once from the field
+    names instead of building a dict for every row.  Rows are read in
+    blocks of ``blocksize``, and the date column of a block is parsed
+    in one pass.
+
+    Rows that do not fit the fast path (wrong number of fields, or
+    anything other than a single credit or debit) are handed to
+    ``dict_to_xn`` so that they are treated exactly as by the CSV
+    reader, including any errors raised.
+    """
+
+    def __init__(self, blocksize=1024, **kwargs):
+        super(Reader, self).__init__(**kwargs)
+        self.blocksize = blocksize
+        self.rows = self.csvreader.reader
+        self.fieldnames = self.csvreader.fieldnames  # reads the header
+        self.columns = None
+        self.pending = collections.deque()
+        self.error = None  # raised once the pending rows are used up
+        if self.fieldnames is not None:
+            self.columns = self._columns()
+
+    def _columns(self):
+        """Return the column indices of the fields, or None if missing."""
+        positions = {}
+        for i, name in enumerate(self.fieldnames):
+            positions[name.strip()] = i
+        try:
+            date = positions[self._fieldname('Date')]
+            desc = positions[self._fieldname('Description')]
+            amount = positions.get(self._fieldname('Amount'))
+            if amount is not None:
+                return date, desc, amount, None, None
+            return (
+                date,
+                desc,
+                None,
+                positions[self._fieldname('Credit')],
+                positions[self._fieldname('Debit')],
+            )
+        except KeyError:
+            return None  # dict_to_xn will raise the appropriate error
+
+    def next(self):
+        """Return the next transaction object."""
+        while True:
+            while not self.pending:
+                self.read_block()
+            row, date = self.pending.popleft()
+            try:
+                x = self.row_to_xn(row, date) if date is not SLOW else None
+                if x is None:
+                    x = self.dict_to_xn(self.row_to_dict(row))
+                return x
+            except CSV.MetadataException:
+                pass  # row was metadata; proceed to next row
+
+    def read_block(self):
+        """Read a block of rows and parse its date column.
+
+        Raises StopIteration at the end of the file.  If reading a row
+        fails, the rows before it are kept and the error is raised by
+        the next call, so that it surfaces at the same row as with the
+        CSV reader.
+        """
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+        if self.fieldnames is None:
+            raise StopIteration
+        block = []
+        try:
+            for row in itertools.islice(self.rows, self.blocksize):
+                block.append(row)
+        except Exception as e:
+            if not block:
+                raise
+            self.error = e
+        if not block:
+            raise StopIteration
+        block = [row for row in block if row != []]  # as csv.DictReader
+        dates = [SLOW] * len(block)
+        if self.columns is not None:
+            n = len(self.fieldnames)
+            date_i = self.columns[0]
+            fast = [k for k, row in enumerate(block) if len(row) == n]
+            try:
+                parsed = map(
+                    self.parse_date,
+                    [block[k][date_i] for k in fast]
+                )
+            except Exception:
+                pass  # dict_to_xn will raise for the bad row
+            else:
+                for k, date in itertools.izip(fast, parsed):
+                    dates[k] = date
+        self.pending.extend(itertools.izip(block, dates))
+
+    def row_to_dict(self, row):
+        """Convert a row into a dict, as csv.DictReader does."""
+        fields = dict(itertools.izip(self.fieldnames, row))
+        n = len(self.fieldnames)
+        if n < len(row):
+            fields[None] = row[n:]
+        else:
+            for name in self.fieldnames[len(row):]:
+                fields[name] = None
+        return fields
+
+    def row_to_xn(self, row, date):
+        """Convert a row with a parsed date into a transaction.
+
+        Return None if the row must go through ``dict_to_xn``.
+        """
+        _, desc_i, amount_i, credit_i, debit_i = self.columns
+        if amount_i is not None:
+            amount = self.amount(row[amount_i])
+            magnitude = magnitude_of(amount, row[amount_i])
+            if magnitude is None:
+                return None
+            if not (amount.is_signed() or amount.is_zero()):
+                return xn.Xn(
+                    date=date,
+                    desc=row[desc_i],
+                    amount=magnitude,
+                    dst=[xn.Endpoint(self.account, amount)]  # credit
+                )
+            return xn.Xn(
+                date=date,
+                desc=row[desc_i],
+                amount=magnitude,
+                src=[xn.Endpoint(self.account, amount)]  # debit
+            )
+
+        credit, debit = row[credit_i], row[debit_i]
+        if bool(credit) == bool(debit):
+            return None  # dubious, metadata or an error
+        amount_raw = credit or debit
+        amount = magnitude_of(
+            self.amount(amount_raw, strict=True),
+            amount_raw
+        )
+        if amount is None:
+            return None
+        if credit:
+            return xn.Xn(
+                date=date,
+                desc=row[desc_i],
+                amount=amount,
+                dst=[xn.Endpoint(self.account, amount)]  # credit
+            )
+        return xn.Xn(
+            date=date,
+            desc=row[desc_i],
+            amount=amount,
+            src=[xn.Endpoint(self.account, -amount)]  # debit
+        )
@@ -0,0 +1,159 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import cStringIO
+import csv
+import mmap
+import os
+import stat
+
+from . import FastCSV
+
+
+def mappable(file):
+    """Return the file descriptor of file if it can be mapped, or None."""
+    try:
+        fileno = file.fileno()
+        st = os.fstat(fileno)
+    except (AttributeError, EnvironmentError, ValueError):
+        return None
+    if not stat.S_ISREG(st.st_mode) or st.st_size == 0:
+        return None
+    return fileno
+
+
+def row_end(data, quoted=False):
+    """Find the end of the CSV row that continues into data.
+
+    ``quoted`` is true if data begins inside a quoted field.  Return
+    ``(i, quoted)``, where ``i`` is the offset just past the newline
+    that ends the row, or None if the row does not end within data, in
+    which case ``quoted`` tells whether data ends inside a quoted field.
+    """
+    i = 0
+    while True:
+        nl = data.find('\n', i)
+        if nl < 0:
+            return None, bool(quoted ^ data.count('"', i) % 2)
+        quoted ^= data.count('"', i, nl) % 2
+        if not quoted:
+            return nl + 1, False
+        i = nl + 1
+
+
+class Reader(FastCSV.Reader):
+    """CSV statement reader for very large files.
+
+    Takes the same arguments, and produces the same transactions, as
+    the CSV reader.  The file is divided into spans of about
+    ``chunksize`` bytes that end on a row boundary, taking quoted
+    fields into account, and each span is read through its own memory
+    map, so memory use does not grow with the size of the file.  In
+    ``reverse`` mode the spans are read last to first, and records may
+    span multiple lines.
+
+    Spans can be read independently of each other with ``read_span``,
+    so they may be handed to worker processes that inherit the reader
+    (see ``parallel.match_spans``).  ``mapped`` is false for files that
+    cannot be mapped, such as pipes, which are read as by the FastCSV
+    reader.  The row boundaries of a span are found by counting
+    quote characters, so quotes may only appear in quoted fields (as
+    the csv module writes them) and rows must end with a newline.
+    """
+
+    def __init__(self, chunksize=1 << 18, **kwargs):
+        self.fileno = mappable(kwargs.get('file'))
+        self.mapped = self.fileno is not None
+        if not self.mapped:
+            super(Reader, self).__init__(**kwargs)
+            return
+        self.reverse = kwargs.pop('reverse', False)
+        if kwargs.get('fieldnames') is None:
+            line = kwargs['file'].readline()
+            kwargs['fieldnames'] = csv.reader([line]).next()
+        super(Reader, self).__init__(**kwargs)
+        self.chunksize = chunksize
+        self.start = self.file.tell()
+        self.size = os.fstat(self.fileno).st_size
+        self.rows = self.mapped_rows()
+
+    def read(self, start, stop):
+        """Return the bytes of the file from start to stop."""
+        base = start - start % mmap.ALLOCATIONGRANULARITY
+        m = mmap.mmap(
+            self.fileno, stop - base, access=mmap.ACCESS_READ, offset=base
+        )
+        try:
+            return m[start - base:stop - base]
+        finally:
+            m.close()
+
+    def spans(self):
+        """Generate ``(start, stop)`` offsets of spans of whole rows."""
+        pos = self.start
+        while pos < self.size:
+            stop = min(pos + self.chunksize, self.size)
+            chunk = self.read(pos, stop)
+            quoted = chunk.count('"', 0, len(chunk) - 1) % 2
+            stop -= 1  # the row ends with, or after, the last byte
+            while stop < self.size:
+                data = self.read(stop, min(stop + 65536, self.size))
+                end, quoted = row_end(data, quoted)
+                if end is not None:
+                    stop += end
+                    break
+                stop += len(data)
+            yield pos, stop
+            pos = stop
+
+    def span_rows(self, start, stop):
+        """Return the rows of a span, last first in reverse mode."""
+        lines = cStringIO.StringIO(self.read(start, stop))
+        rows = list(csv.reader(lines))
+        if self.reverse:
+            rows.reverse()
+        return rows
+
+    def read_span(self, start, stop):
+        """Read the transactions of a span.
+
+        Return ``(xns, error)``, where error is the exception raised by
+        the row after the last of xns, or None.  The reader is left at
+        the end of the span.
+        """
+        self.rows = iter(self.span_rows(start, stop))
+        self.pending.clear()
+        self.error = None
+        xns = []
+        try:
+            while True:
+                xns.append(self.next())
+        except StopIteration:
+            return xns, None
+        except Exception as e:
+            return xns, e
+
+    def ordered_spans(self):
+        """Return the spans in the order they are to be read."""
+        if self.reverse:
+            return reversed(list(self.spans()))
+        return self.spans()
+
+    def mapped_rows(self):
+        """Generate the rows of the file, span by span."""
+        for start, stop in self.ordered_spans():
+            for row in self.span_rows(start, stop):
+                yield row
@@ -15,3 +15,5 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from . import CSV
+from . import FastCSV
+from . import MappedCSV
@@ -0,0 +1,90 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+import decimal
+import StringIO
+import unittest
+
+from . import CSV
+
+
+class ParseTestCase(unittest.TestCase):
+    def setUp(self):
+        self.reader = CSV.Reader(
+            file=StringIO.StringIO('Date,Description,Amount\n'),
+            account='Assets:Bank',
+            cachesize=2
+        )
+
+    def test_parse_date(self):
+        parse = self.reader.parse_date
+        self.assertEqual(parse('01/07/2012'), datetime.date(2012, 7, 1))
+        self.assertIsNotNone(self.reader.date_layout)
+        # other layouts are still recognised
+        self.assertEqual(parse('2012-07-02'), datetime.date(2012, 7, 2))
+        self.assertEqual(parse('20120703'), datetime.date(2012, 7, 3))
+        self.assertRaises(ValueError, parse, '31/02/2012')
+        self.assertEqual(len(self.reader.dates), 2)
+
+    def test_parse_date_unrecognised(self):
+        self.assertIsNone(self.reader.parse_date('1-2-3'))
+        self.assertIsNone(self.reader.date_layout)  # not locked in
+
+    def test_date_format(self):
+        self.reader.date_format = '%m/%d/%Y'
+        self.assertEqual(
+            self.reader.parse_date('07/01/2012'),
+            datetime.date(2012, 7, 1)
+        )
+
+    def test_amount(self):
+        amount = self.reader.amount
+        self.assertEqual(amount('-$1,000.50'), decimal.Decimal('-1000.50'))
+        self.assertIs(amount('-$1,000.50'), amount('-$1,000.50'))
+        self.assertEqual(amount('2.00', strict=True), decimal.Decimal(2))
+        self.assertRaises(
+            decimal.InvalidOperation,
+            amount, '-$1,000.50', strict=True
+        )
+
+
+class UnseekableFile(StringIO.StringIO):
+    """A stream that reports a position but cannot seek, like a pipe."""
+    def seek(self, pos, mode=0):
+        raise IOError(29, 'Illegal seek')
+
+
+class ReverseTestCase(unittest.TestCase):
+    text = (
+        'Date,Description,Amount\n'
+        '01/07/2012,Coffee,-4.50\n'
+        '02/07/2012,Tea,-3.00\n'
+    )
+
+    def descs(self, file):
+        reader = CSV.Reader(file=file, account='Assets:Bank', reverse=True)
+        return [x.desc for x in reader]
+
+    def test_seekable(self):
+        self.assertEqual(
+            self.descs(StringIO.StringIO(self.text)), ['Tea', 'Coffee']
+        )
+
+    def test_unseekable(self):
+        self.assertEqual(
+            self.descs(UnseekableFile(self.text)), ['Tea', 'Coffee']
+        )
@@ -0,0 +1,126 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import csv
+import StringIO
+import unittest
+
+from .. import reader
+from . import CSV
+from . import FastCSV
+
+amount_csv = """Date,Description,Amount
+01/07/2012,Coffee,-$4.50
+
+20120702,Salary,"2,000.00"
+2012-07-03,Lunch,-13
+2012/7/4,Refund,+$1.00
+5-7-2012,Extra field,1.00,oops
+6/7/2012,Short
+"""
+
+debit_credit_csv = """ Date , Description ,Debit,Credit
+01/07/2012,Opening Balance,,
+01/07/2012,Coffee,-4.50,
+02/07/2012,Salary,,2000.00
+1-2-3,Weird date,1.00,
+03/07/2012,Closing Balance,,
+"""
+
+
+def summary(x):
+    return (
+        x.date, x.desc, x.amount,
+        [(ep.account, ep.amount) for ep in x.src or ()],
+        [(ep.account, ep.amount) for ep in x.dst or ()],
+    )
+
+
+def read(cls, text, **kwargs):
+    """Read all transactions; errors are recorded as results."""
+    r = cls(file=StringIO.StringIO(text), account='Assets:Bank', **kwargs)
+    result = []
+    while True:
+        try:
+            result.append(summary(r.next()))
+        except StopIteration:
+            return result
+        except Exception as e:
+            result.append(type(e))
+
+
+class FastCSVTestCase(unittest.TestCase):
+    def assertSame(self, text, **kwargs):
+        for blocksize in (1, 2, 1024):
+            self.assertEqual(
+                read(FastCSV.Reader, text, blocksize=blocksize, **kwargs),
+                read(CSV.Reader, text, **kwargs)
+            )
+
+    def test_amount(self):
+        self.assertSame(amount_csv)
+
+    def test_debit_credit(self):
+        self.assertSame(debit_credit_csv)
+
+    def test_reverse(self):
+        self.assertSame(amount_csv, reverse=True)
+
+    def test_fieldnames(self):
+        self.assertSame(
+            amount_csv.split('\n', 1)[1],
+            fieldnames=['Date', 'Description', 'Value'],
+            fieldremap={'Amount': 'Value'},
+        )
+
+    def test_date_format(self):
+        self.assertSame(
+            "Date,Description,Amount\n01.07.2012,Coffee,-4.50\n",
+            date_format='%d.%m.%Y'
+        )
+
+    def test_missing_field(self):
+        self.assertSame("Date,Amount\n01/07/2012,-4.50\n")
+
+    def test_empty(self):
+        self.assertSame("")
+        self.assertSame("Date,Description,Amount\n")
+
+    def test_bad_row(self):
+        text = (
+            "Date,Description,Amount\n"
+            "01/07/2012,Coffee,-4.50\n"
+            "02/07/2012,Tea,-3.00\n"
+            "03/07/2012,Nul\0,-1.00\n"
+            "04/07/2012,Cake,-5.00\n"
+        )
+        result = read(FastCSV.Reader, text, blocksize=1024)
+        self.assertEqual(len(result), 4)
+        self.assertEqual(result[2], csv.Error)
+        self.assertSame(text)
+
+    def test_reverse_multi_line(self):
+        text = (
+            "Date,Description,Amount\n"
+            "01/07/2012,Coffee,-4.50\n"
+            '02/07/2012,"Two\nlines",-3.00\n'
+            "03/07/2012,Tea,-1.00\n"
+            "04/07/2012,Cake,-5.00\n"
+        )
+        result = read(FastCSV.Reader, text, blocksize=1024, reverse=True)
+        self.assertEqual([x[1] for x in result[:2]], ['Cake', 'Tea'])
+        self.assertEqual(result[2], reader.DataError)
+        self.assertSame(text, reverse=True)
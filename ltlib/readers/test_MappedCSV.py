@@ -0,0 +1,115 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import tempfile
+import unittest
+
+from . import CSV
+from . import MappedCSV
+from .test_FastCSV import amount_csv, debit_credit_csv, read, summary
+
+quoted_csv = '''Date,Description,Amount
+01/07/2012,"Coffee, ""large""",-4.50
+02/07/2012,"Multi
+line
+""description""",-1.00
+03/07/2012,"",2.00
+
+04/07/2012,"a""
+""b",3.00
+05/07/2012,"End",4.00'''  # no final newline
+
+
+def read_file(text, **kwargs):
+    """Read all transactions from a file containing text."""
+    fd, path = tempfile.mkstemp()
+    try:
+        os.write(fd, text)
+        os.close(fd)
+        with open(path) as f:
+            r = MappedCSV.Reader(file=f, account='Assets:Bank', **kwargs)
+            result = []
+            while True:
+                try:
+                    result.append(summary(r.next()))
+                except StopIteration:
+                    return result
+                except Exception as e:
+                    result.append(type(e))
+    finally:
+        os.remove(path)
+
+
+class MappedCSVTestCase(unittest.TestCase):
+    texts = [amount_csv, debit_credit_csv, quoted_csv]
+
+    def test_same_as_csv(self):
+        for text in self.texts:
+            expected = read(CSV.Reader, text)
+            for chunksize in (1, 2, 3, 10, 50, 1 << 18):
+                self.assertEqual(
+                    read_file(text, chunksize=chunksize),
+                    expected,
+                    (text, chunksize)
+                )
+
+    def test_reverse(self):
+        expected = list(reversed(read(CSV.Reader, quoted_csv)))
+        for chunksize in (1, 7, 1 << 18):
+            self.assertEqual(
+                read_file(quoted_csv, chunksize=chunksize, reverse=True),
+                expected
+            )
+        self.assertEqual(
+            read_file(debit_credit_csv, chunksize=5, reverse=True),
+            read(CSV.Reader, debit_credit_csv, reverse=True)
+        )
+
+    def test_read_span(self):
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(quoted_csv)
+            f.flush()
+            r = MappedCSV.Reader(
+                file=open(f.name), account='Assets:Bank', chunksize=8
+            )
+            spans = list(r.spans())
+            self.assertEqual(spans[0][0], len(quoted_csv.split('\n')[0]) + 1)
+            self.assertEqual(spans[-1][1], len(quoted_csv))
+            for (_, stop), (start, _) in zip(spans, spans[1:]):
+                self.assertEqual(stop, start)
+            result = []
+            for span in spans:
+                xns, error = r.read_span(*span)
+                self.assertIsNone(error)
+                result.extend(map(summary, xns))
+            self.assertEqual(result, read(CSV.Reader, quoted_csv))
+
+    def test_not_mappable(self):
+        for text in self.texts:
+            self.assertEqual(
+                read(MappedCSV.Reader, text),
+                read(CSV.Reader, text)
+            )
+        self.assertEqual(read_file(''), [])
+        self.assertEqual(read_file('Date,Description,Amount\n'), [])
+
+    def test_row_end(self):
+        self.assertEqual(MappedCSV.row_end('a,b\nc'), (4, False))
+        self.assertEqual(MappedCSV.row_end('"a\n",b\nc'), (7, False))
+        self.assertEqual(MappedCSV.row_end('a\nb', quoted=True), (None, True))
+        self.assertEqual(MappedCSV.row_end('a"\n', quoted=True), (3, False))
+        self.assertEqual(MappedCSV.row_end('"a'), (None, True))
@@ -0,0 +1,141 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Review queue of transactions set aside during batch processing.
+
+A queue file holds one JSON object per line, each describing a
+transaction as it was before rule processing, and under ``prev`` the
+transaction before it in the statement, if any, as it was written.
+Strings are stored as latin-1 so that statement text in any encoding
+survives the round trip byte for byte.
+"""
+
+import collections
+import datetime
+import decimal
+import json
+
+from . import xn
+
+
+def xn_to_dict(x):
+    """Convert a transaction into a dict of JSON-compatible values."""
+    def endpoints(eps):
+        if eps is None:
+            return None
+        return [[ep.account, str(ep.amount)] for ep in eps]
+    return {
+        'date': x.date.isoformat() if x.date else None,
+        'desc': x.desc,
+        'amount': str(x.amount) if x.amount is not None else None,
+        'src': endpoints(x.src),
+        'dst': endpoints(x.dst),
+    }
+
+
+def _bytes(s):
+    return s.encode('latin-1') if isinstance(s, unicode) else s
+
+
+def dict_to_xn(d):
+    """Convert a dict produced by ``xn_to_dict`` into a transaction."""
+    def endpoints(eps):
+        if eps is None:
+            return None
+        return [
+            xn.Endpoint(_bytes(account), decimal.Decimal(amount))
+            for account, amount in eps
+        ]
+    date = d['date']
+    return xn.Xn(
+        date=datetime.datetime.strptime(date, '%Y-%m-%d').date()
+            if date else None,
+        desc=_bytes(d['desc']),
+        amount=decimal.Decimal(d['amount'])
+            if d['amount'] is not None else None,
+        src=endpoints(d['src']),
+        dst=endpoints(d['dst']),
+    )
+
+
+def dump(x, file, prevxn=None):
+    """Append a transaction to an open queue file.
+
+    ``prevxn`` is the transaction that came before x in the statement,
+    as it was written, which rebate outcomes are worked out from.
+    """
+    record = xn_to_dict(x)
+    if prevxn is not None:
+        record['prev'] = xn_to_dict(prevxn)
+    file.write(json.dumps(record, encoding='latin-1', sort_keys=True) + '\n')
+
+
+def load(file):
+    """Generate ``(xn, prevxn)`` for each transaction in an open queue file.
+
+    ``prevxn`` is None if the transaction had no predecessor when it
+    was queued.
+    """
+    for line in file:
+        if line.strip():
+            record = json.loads(line)
+            prev = record.get('prev')
+            yield (
+                dict_to_xn(record),
+                dict_to_xn(prev) if prev is not None else None
+            )
+
+
+def key(x):
+    """Return a string that is the same for identical transactions."""
+    return json.dumps(xn_to_dict(x), encoding='latin-1', sort_keys=True)
+
+
+class QueueWriter(object):
+    """Appends transactions to a queue file, unless already queued.
+
+    Running ``lt-stmtproc --batch`` again over the same statement must
+    not queue its transactions a second time.  The transactions in the
+    file when the writer is created are counted, and each one queued
+    again uses up one of the count instead of being written.
+    """
+    def __init__(self, file):
+        """Initialise the writer.
+
+        ``file``
+          The queue file, open for appending.  If it has a name, the
+          transactions already in it are read from that path.
+        """
+        self.file = file
+        self.queued = collections.Counter()
+        try:
+            with open(file.name) as fh:
+                for x, prevxn in load(fh):
+                    self.queued[key(x)] += 1
+        except (AttributeError, IOError):
+            pass  # no name, or not readable; assume empty
+
+    def dump(self, x, prevxn=None):
+        """Queue x, unless it is already queued.
+
+        Return whether x was written.
+        """
+        k = key(x)
+        if self.queued[k]:
+            self.queued[k] -= 1
+            return False
+        dump(x, self.file, prevxn)
+        return True
@@ -0,0 +1,227 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Account totals rolled up by day, month and financial year.
+
+The total of an account over a range of dates is the sum of the
+financial years, then months, then days that make up the range, so a
+query costs at most a few dozen lookups however long the history.
+Financial years are as for ``config.format_outpat``.
+"""
+
+import datetime
+
+from . import config
+
+ONE_DAY = datetime.timedelta(1)
+
+PERIODS = ('day', 'month', 'fy')
+
+
+def next_month(date):
+    """Return the first day of the month after that of date."""
+    if date.month == 12:
+        return datetime.date(date.year + 1, 1, 1)
+    return datetime.date(date.year, date.month + 1, 1)
+
+
+def period_start(period, date):
+    """Return the first day of the period that date is in."""
+    if period == 'day':
+        return date
+    if period == 'month':
+        return date.replace(day=1)
+    if period == 'fy':
+        return datetime.date(config.fy(date) - 1, 7, 1)
+    raise ValueError('Unknown period: {!r}'.format(period))
+
+
+def period_end(period, start):
+    """Return the first day after the period beginning on start."""
+    if period == 'day':
+        return start + ONE_DAY
+    if period == 'month':
+        return next_month(start)
+    if period == 'fy':
+        return datetime.date(config.fy(start), 7, 1)
+    raise ValueError('Unknown period: {!r}'.format(period))
+
+
+def period_label(period, start):
+    """Return the name of the period beginning on start."""
+    if period == 'day':
+        return start.isoformat()
+    if period == 'month':
+        return start.strftime('%Y-%m')
+    return 'FY{}'.format(config.fy(start))
+
+
+class Rollup(object):
+    """Totals of accounts by day, month and financial year.
+
+    ``days``, ``months`` and ``years`` map each account to its totals
+    by date, ``(year, month)`` and financial year.  Postings are added
+    to a day's total first, and rolled up into the months and years
+    when next needed, which saves most of the (slow) Decimal sums.
+    ``first`` and ``last`` are the dates of the earliest and latest
+    postings, or None if there are none.
+    """
+    def __init__(self):
+        self._days = {}
+        self._months = {}
+        self._years = {}
+        self._pending = {}  # (account, date) -> total not yet rolled up
+        self.first = self.last = None
+
+    def __getstate__(self):
+        self._settle()
+        return self.__dict__
+
+    @property
+    def days(self):
+        self._settle()
+        return self._days
+
+    @property
+    def months(self):
+        self._settle()
+        return self._months
+
+    @property
+    def years(self):
+        self._settle()
+        return self._years
+
+    def add(self, account, date, amount):
+        """Add a posting."""
+        self.add_postings(date, [(account, amount)])
+
+    def add_xn(self, x):
+        """Add the postings of a transaction."""
+        self.add_postings(x.date, [
+            (ep.account, ep.amount) for ep in (x.src or []) + (x.dst or [])
+        ])
+
+    def add_postings(self, date, postings):
+        """Add ``(account, amount)`` postings made on a date."""
+        pending = self._pending
+        for account, amount in postings:
+            key = account, date
+            pending[key] = pending[key] + amount if key in pending else amount
+        if self.first is None or date < self.first:
+            self.first = date
+        if self.last is None or date > self.last:
+            self.last = date
+
+    def _settle(self):
+        """Roll the pending day totals up into the buckets."""
+        if not self._pending:
+            return
+        for (account, date), amount in self._pending.iteritems():
+            self._add_total(account, date, amount)
+        self._pending = {}
+
+    def _add_total(self, account, date, amount):
+        for buckets, key in (
+            (self._days, date),
+            (self._months, (date.year, date.month)),
+            (self._years, config.fy(date)),
+        ):
+            totals = buckets.setdefault(account, {})
+            totals[key] = totals[key] + amount if key in totals else amount
+
+    def update(self, other):
+        """Add the totals of another rollup."""
+        for account, days in other.days.iteritems():
+            for date, amount in days.iteritems():
+                self.add(account, date, amount)
+
+    def accounts(self):
+        """Return the sorted names of the accounts with postings."""
+        return sorted(self.days)
+
+    def total(self, account, begin=None, end=None):
+        """Return the total of an account's postings.
+
+        Only postings dated on or after ``begin`` and before ``end``
+        are counted, if given.
+        """
+        if account not in self.days:
+            return 0
+        if begin is None and end is None:
+            return sum(self.years[account].itervalues())
+        if begin is None or begin < self.first:
+            begin = self.first
+        if end is None or end > self.last:
+            end = self.last + ONE_DAY
+        days = self.days[account]
+        months = self.months[account]
+        years = self.years[account]
+        total = 0
+        date = begin
+        while date < end:
+            if date.day == 1:
+                if date.month == 7:
+                    stop = datetime.date(date.year + 1, 7, 1)
+                    if stop <= end:
+                        total += years.get(config.fy(date), 0)
+                        date = stop
+                        continue
+                stop = next_month(date)
+                if stop <= end:
+                    total += months.get((date.year, date.month), 0)
+                    date = stop
+                    continue
+            total += days.get(date, 0)
+            date += ONE_DAY
+        return total
+
+    def totals(self, accounts=None, begin=None, end=None):
+        """Return a dict of the totals of accounts, by name.
+
+        ``accounts`` defaults to all of them; ``begin`` and ``end``
+        select dates as for ``total``.
+        """
+        if accounts is None:
+            accounts = self.days
+        return dict(
+            (account, self.total(account, begin, end))
+            for account in accounts
+        )
+
+    def series(self, accounts, period, begin=None, end=None):
+        """Return the total of accounts in each period.
+
+        Return a list of ``(start, total)`` for each period, by its
+        first day, from the one containing ``begin`` (or the first
+        posting) to the one containing the day before ``end`` (or the
+        last posting).  The first and last periods only count postings
+        from ``begin`` and before ``end``.
+        """
+        if self.first is None:
+            return []
+        begin = begin or self.first
+        end = end or self.last + ONE_DAY
+        result = []
+        start = period_start(period, begin)
+        while start < end:
+            stop = period_end(period, start)
+            result.append((start, sum(
+                self.total(account, max(start, begin), min(stop, end))
+                for account in accounts
+            )))
+            start = stop
+        return result
@@ -21,8 +21,12 @@ class Condition(object):
     """A rule condition.
 
     Provides Condition.match(xn) which returns True if the rule
-    matches the condition, otherwise False.
+    matches the condition, otherwise False.  ``cost`` is the rough
+    relative cost of a call to match, by which a rule orders its
+    conditions.
     """
+    cost = 4
+
     def __init__(self, *args, **kwargs):
         self.value = kwargs.pop('value')
         super(Condition, self).__init__(*args, **kwargs)
@@ -39,8 +43,15 @@ class OperatorCondition(Condition):
         self.op = kwargs.pop('op')
         super(OperatorCondition, self).__init__(*args, **kwargs)
 
+    def __repr__(self):
+        return "{}(op={}, value={!r})".format(
+            self.__class__.__name__, self.op.__name__, self.value
+        )
+
 
 class AccountCondition(Condition):
+    cost = 2
+
     def __init__(self, *args, **kwargs):
         """
         Any '::' expands to 1+ intermediate fragments.
@@ -71,13 +82,22 @@ class DestinationCondition(AccountCondition):
 
 
 class DescriptionCondition(Condition):
+    cost = 4
+
     def match(self, xn):
         if xn.desc is None:
             return False
         return self.value.search(xn.desc)
 
+    def __repr__(self):
+        return "{}(value={!r})".format(
+            self.__class__.__name__, self.value.pattern
+        )
+
 
 class AmountCondition(OperatorCondition):
+    cost = 1
+
     def match(self, xn):
         if xn.amount is None:
             return False
@@ -85,6 +105,8 @@ class AmountCondition(OperatorCondition):
 
 
 class DateCondition(OperatorCondition):
+    cost = 1
+
     def match(self, xn):
         if xn.date is None:
             return False
@@ -95,8 +117,11 @@ class Outcome(object):
     """Specifies a rule outcome.
 
     A rule outcome consists of a value, and a numeric score associated
-    with that value.
+    with that value.  ``key`` names the transaction field the outcome
+    concerns.
     """
+    key = None
+
     def __init__(self, *args, **kwargs):
         self.value = kwargs.pop('value')
         self.score = kwargs.pop('score')
@@ -104,25 +129,48 @@ class Outcome(object):
 
 
 class DropOutcome(Outcome):
+    key = 'drop'
+
     def __init__(self, *args, **kwargs):
         super(DropOutcome, self).__init__(*args, value=None, **kwargs)
 
 
 class RebateOutcome(Outcome):
+    key = 'rebate'
+
     def __init__(self, *args, **kwargs):
         super(RebateOutcome, self).__init__(*args, value=None, **kwargs)
 
 
 class SourceOutcome(Outcome):
-    pass
+    key = 'src'
 
 
 class DestinationOutcome(Outcome):
-    pass
+    key = 'dst'
 
 
 class DescriptionOutcome(Outcome):
-    pass
+    key = 'desc'
+
+
+def group_outcomes(outcomes):
+    """Group outcomes by key.
+
+    Return a list of ``(key, items)`` pairs in the order the keys first
+    appear, where ``items`` holds the ``(value, score)`` of each
+    outcome with that key, in order.
+    """
+    grouped = []
+    items = {}
+    for outcome in outcomes:
+        if outcome.key is None:
+            raise KeyError
+        if outcome.key not in items:
+            items[outcome.key] = []
+            grouped.append((outcome.key, items[outcome.key]))
+        items[outcome.key].append((outcome.value, outcome.score))
+    return grouped
 
 
 class Rule(object):
@@ -132,7 +180,8 @@ class Rule(object):
     returns to the transaction a set of outcomes with probabilities.
 
     How these outcomes are used by the Xn is outside the scope of this
-    class.
+    class.  ``source`` is the ``(filename, lineno)`` the rule was parsed
+    from, if known.
     """
     def __init__(self, *args):
         """Initialise the rule"""
@@ -140,6 +189,7 @@ class Rule(object):
 
         self.conditions = []
         self.outcomes = []
+        self.source = None
 
         for condition_or_outcome in args:
             if isinstance(condition_or_outcome, Condition):
@@ -149,12 +199,40 @@ class Rule(object):
             elif condition_or_outcome is not None:
                 raise Exception  # TODO specialise
 
-    def match(self, xn):
+        self.grouped = group_outcomes(self.outcomes)
+        self.order = sorted(self.conditions, key=lambda c: c.cost)
+
+    def match(self, xn, skip=()):
         """Processes a transaction against this rule
 
         If all conditions are satisfied, a list of outcomes is returned.
-        If any condition is unsatisifed, None is returned.
+        If any condition is unsatisifed, None is returned.  Conditions
+        are checked in the order given by ``order``, and checking stops
+        at the first that is unsatisfied.  Conditions in ``skip`` are
+        taken to be satisfied, e.g. because an index has checked them.
+        """
+        for condition in self.order:
+            if condition not in skip and not condition.match(xn):
+                return None
+        return self.outcomes
+
+    def reorder(self, stats):
+        """Order the conditions by their measured selectivity.
+
+        ``stats`` maps the index of each condition in ``conditions`` to
+        ``(calls, hits)``, the number of times it was checked and
+        satisfied, as counted in an earlier run.  Conditions are
+        checked in increasing order of cost per rejection,
+        ``cost / (1 - hits / calls)``, so cheap conditions that often
+        fail come first.  A condition without counts is taken to be
+        satisfied half the time.
         """
-        if all(map(lambda x: x.match(xn), self.conditions)):
-            return self.outcomes
-        return None
+        def rank(pair):
+            i, condition = pair
+            calls, hits = stats.get(i, (0, 0))
+            passed = float(hits) / calls if calls else 0.5
+            if passed >= 1:
+                return float('inf')
+            return condition.cost / (1 - passed)
+        self.order = [c for i, c in sorted(enumerate(self.conditions),
+                                           key=rank)]
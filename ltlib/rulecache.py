@@ -0,0 +1,91 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import cPickle as pickle
+import hashlib
+import os
+import stat
+
+from . import parse
+from . import util
+
+# bump whenever the pickled form of rules changes
+VERSION = 4
+
+
+class RuleCache(object):
+    """On-disk cache of parsed rule files.
+
+    Each rule file is cached in its own file in the cache directory,
+    keyed on the path, size, modification time and SHA-1 digest of
+    the rule file.  A rule file is reparsed if any of these change.
+    """
+    def __init__(self, dir):
+        """Initialise the cache.
+
+        ``dir``
+          The cache directory, which is created when first needed.
+          If None, rule files are always parsed.
+        """
+        self.dir = dir
+
+    def _cachefile(self, path):
+        return os.path.join(
+            self.dir,
+            hashlib.sha1(path).hexdigest() + '.rules'
+        )
+
+    def file2rules(self, file):
+        """Return the rules in the given open rule file.
+
+        Falls back to ``parse.file2rules`` for files that are not
+        regular files, e.g. pipes.
+        """
+        try:
+            st = os.fstat(file.fileno())
+        except (AttributeError, IOError, OSError, ValueError):
+            st = None
+        if self.dir is None or st is None or not stat.S_ISREG(st.st_mode):
+            return parse.file2rules(file)
+
+        data = file.read()
+        path = os.path.abspath(file.name)
+        key = (
+            VERSION,
+            path,
+            st.st_size,
+            st.st_mtime,
+            hashlib.sha1(data).hexdigest(),
+        )
+        cachefile = self._cachefile(path)
+        try:
+            with open(cachefile, 'rb') as fh:
+                cached_key, rules = pickle.load(fh)
+            if cached_key == key:
+                return rules
+        except Exception:
+            pass  # missing, stale or corrupt cache file
+
+        rules = parse.file2rules(data.splitlines(True), file.name)
+        self._store(cachefile, key, rules)
+        return rules
+
+    def _store(self, cachefile, key, rules):
+        """Atomically write the cache file, ignoring any failure."""
+        try:
+            util.dump_atomic((key, rules), cachefile)
+        except (IOError, OSError, pickle.PicklingError):
+            pass
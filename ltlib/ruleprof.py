@@ -0,0 +1,216 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Rule evaluation profiler."""
+
+import cPickle as pickle
+import os
+import timeit
+
+from . import util
+
+# bump whenever the pickled form of saved stats changes
+VERSION = 1
+
+
+class Counter(object):
+    """Call and hit counts, and cumulative time, of a match method."""
+    __slots__ = ('calls', 'hits', 'seconds')
+
+    def __init__(self):
+        self.calls = 0
+        self.hits = 0
+        self.seconds = 0.0
+
+
+def counted(match, counter, clock=timeit.default_timer):
+    """Return a wrapper of match that updates counter."""
+    def wrapper(xn, *args):
+        start = clock()
+        result = match(xn, *args)
+        counter.seconds += clock() - start
+        counter.calls += 1
+        if result:
+            counter.hits += 1
+        return result
+    return wrapper
+
+
+def describe(r, i):
+    """Return where rule r, the i'th of the ruleset, came from."""
+    if r.source is None:
+        return 'rule {}'.format(i + 1)
+    name, lineno = r.source
+    return '{}:{}'.format(name or '<rules>', lineno)
+
+
+def key(r, i):
+    """Return the key of the i'th condition of rule r in saved stats.
+
+    The key is ``(filename, lineno, i)``, which stays the same from one
+    run to the next while the rule file is unchanged, or None if it is
+    not known where r came from.
+    """
+    if r.source is None or r.source[0] is None:
+        return None
+    name, lineno = r.source
+    return (os.path.abspath(name), lineno, i)
+
+
+def load(path):
+    """Return the stats saved in the file at path.
+
+    An empty dict is returned if path is None, or if the file is
+    missing, stale or corrupt.
+    """
+    if path is None:
+        return {}
+    try:
+        with open(path, 'rb') as fh:
+            version, stats = pickle.load(fh)
+        if version == VERSION:
+            return stats
+    except Exception:
+        pass  # missing, stale or corrupt stats file
+    return {}
+
+
+def save(stats, path):
+    """Merge stats into those saved in the file at path.
+
+    The counts of each condition in stats replace any saved earlier.
+    The file is written atomically; any failure is ignored.
+    """
+    if path is None:
+        return
+    merged = load(path)
+    merged.update(stats)
+    try:
+        util.dump_atomic((VERSION, merged), path)
+    except (IOError, OSError, pickle.PicklingError):
+        pass
+
+
+def reorder(rules, stats):
+    """Order the conditions of each rule by the counts in saved stats.
+
+    See ``Rule.reorder``.  Rules without counts in stats keep their
+    order.
+    """
+    for r in rules:
+        counts = {}
+        for i in xrange(len(r.conditions)):
+            k = key(r, i)
+            if k in stats:
+                counts[i] = stats[k]
+        if counts:
+            r.reorder(counts)
+
+
+class Profiler(object):
+    """Counts and times the checks of a ruleset's rules and conditions.
+
+    While the profiler is started, the ``match`` method of each rule
+    and condition is replaced by a wrapper that counts its calls and
+    hits and the time spent in it.  The rules must be matched in this
+    process for the counts to be seen, and cannot be pickled until the
+    profiler is stopped.
+    """
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self.counters = {}  # rule or condition -> Counter
+        self.started = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        if self.started:
+            return
+        for r in self.rules:
+            for obj in [r] + r.conditions:
+                counter = self.counters.setdefault(obj, Counter())
+                obj.match = counted(obj.match, counter)
+        self.started = True
+
+    def stop(self):
+        if not self.started:
+            return
+        for r in self.rules:
+            for obj in [r] + r.conditions:
+                del obj.match  # uncover the class's method
+        self.started = False
+
+    def stats(self):
+        """Return the ``(calls, hits)`` of each condition, by ``key``.
+
+        Conditions of rules that were never checked, or whose source is
+        not known, are left out.
+        """
+        stats = {}
+        for r in self.rules:
+            for i, c in enumerate(r.conditions):
+                k = key(r, i)
+                counter = self.counters.get(c)
+                if k is not None and counter and counter.calls:
+                    stats[k] = (counter.calls, counter.hits)
+        return stats
+
+    def report(self, file, limit=None):
+        """Write a report of the costliest rules to file.
+
+        Rules are listed in decreasing order of the time spent matching
+        them, each followed by its conditions, in the order they are
+        checked.  Rules that never matched and rules that matched every
+        transaction they were checked against are noted.  ``limit``
+        caps the number of rules listed.
+        """
+        counters = self.counters
+        ranked = sorted(
+            enumerate(self.rules),
+            key=lambda pair: (-counters[pair[1]].seconds, pair[0])
+        )
+        line = '{:>10} {:>10} {:>10}  {}'
+        print >> file, line.format('seconds', 'calls', 'hits', 'rule')
+        for i, r in ranked[:limit]:
+            counter = counters[r]
+            note = ''
+            if counter.calls and not counter.hits:
+                note = '  (never matched)'
+            elif counter.calls and counter.hits == counter.calls:
+                note = '  (always matched)'
+            print >> file, line.format(
+                '{:.6f}'.format(counter.seconds),
+                counter.calls,
+                counter.hits,
+                describe(r, i) + note
+            )
+            for c in r.order:
+                counter = counters[c]
+                print >> file, line.format(
+                    '{:.6f}'.format(counter.seconds),
+                    counter.calls,
+                    counter.hits,
+                    '  {!r}'.format(c)
+                )
+        unused = sum(1 for r in self.rules if not counters[r].hits)
+        print >> file, '{} of {} rules never matched'.format(
+            unused, len(self.rules)
+        )
@@ -24,8 +24,24 @@ def score(item):
 
 
 class ScoreSet(object):
+    """Scores given to each of a number of candidate values.
+
+    The running total and count of each value's scores are kept, along
+    with the highest score and the values that have it, so that
+    ``highest`` need not look at every value.  The values scored since
+    the last call of ``highest`` are checked against the top score when
+    it is next called; it is only recomputed from all the totals when
+    every value that had it has been scored lower.
+    """
     def __init__(self, items=None, **kwargs):
         self.items = items or {}
+        self._totals = {}  # value -> [sum, count]
+        for key, scores in self.items.viewitems():
+            self._totals[key] = [sum(scores), len(scores)]
+        self._best = None
+        self._tied = set()
+        self._stale = bool(self.items)
+        self._dirty = set()  # values scored since the last highest()
 
     def __contains__(self, item):
         key = item[0] if isinstance(item, tuple) else item
@@ -37,10 +53,25 @@ class ScoreSet(object):
         item is a pair tuple, the first element of which is a valid dict
         key and the second of which is a numeric value.
         """
-        if item in self:
-            self.items[item[0]].append(item[1])
-        else:
-            self.items[item[0]] = [item[1]]
+        self.extend((item,))
+
+    def extend(self, items):
+        """Append each of a sequence of items to the score set."""
+        all_items, totals, dirty = self.items, self._totals, self._dirty
+        for key, value in items:
+            if key in all_items:
+                all_items[key].append(value)
+                total = totals[key]
+                total[0] += value
+                total[1] += 1
+            else:
+                all_items[key] = [value]
+                totals[key] = [0 + value, 1]  # as sum()
+            dirty.add(key)
+
+    def _final(self, key):
+        total, count = self._totals[key]
+        return total * count ** -.5
 
     def scores(self):
         """Return a list of the items with their final scores.
@@ -48,18 +79,36 @@ class ScoreSet(object):
         The final score of each item is its average score multiplied by the
         square root of its length.  This reduces to sum * len^(-1/2).
         """
-        return map(
-            lambda x: (x[0], sum(x[1]) * len(x[1]) ** -.5),
-            iter(self.items.viewitems())
-        )
+        return [(key, self._final(key)) for key in self.items]
 
     def highest(self):
         """Return the items with the higest score.
 
         If this ScoreSet is empty, returns None.
         """
-        scores = self.scores()
-        if not scores:
+        for key in self._dirty:
+            if self._stale:
+                break
+            final = self._final(key)
+            if self._best is None or final > self._best:
+                self._best = final
+                self._tied = set([key])
+            elif final == self._best:
+                self._tied.add(key)
+            elif key in self._tied:
+                self._tied.discard(key)
+                self._stale = not self._tied
+        self._dirty.clear()
+        if self._stale:
+            scores = self.scores()
+            self._best = max(map(score, scores))
+            self._tied = set(key for key, x in scores if x == self._best)
+            self._stale = False
+        if not self._tied:
             return None
-        maxscore = max(map(score, scores))
-        return filter(lambda x: score(x) == maxscore, scores)
+        if len(self._tied) == 1:
+            key, = self._tied
+            return [(key, self._final(key))]
+        return [
+            (key, self._final(key)) for key in self.items if key in self._tied
+        ]
@@ -0,0 +1,111 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import decimal
+import StringIO
+import subprocess
+import sys
+import unittest
+
+from . import balance
+
+D = decimal.Decimal
+
+OUTPUT = '''\
+             $-10.00  Assets:Bank:Cheque
+                   0  Equity
+                  $5    A
+                 $-5    B
+              $10.00  Expenses
+               $7.00    Food
+               $3.00    Tips
+--------------------
+                   0
+'''
+
+
+def shape(items):
+    return [
+        (node.account_fragment, node.balance, shape(node.children))
+        for node in items
+    ]
+
+
+class BalanceTestCase(unittest.TestCase):
+    def test_tree(self):
+        top = balance.tree({
+            'Assets:Bank:Cheque': D(-10),
+            'Expenses:Food': D(7),
+            'Expenses:Tips': D(3),
+            'Equity:A': D(5),
+            'Equity:B': D(-5),
+            'Income:Salary': D(0),
+        })
+        self.assertEqual(shape(top), [
+            ('Assets:Bank:Cheque', -10, []),
+            ('Equity', 0, [('A', 5, []), ('B', -5, [])]),
+            ('Expenses', 10, [('Food', 7, []), ('Tips', 3, [])]),
+        ])
+        expenses = top[2]
+        self.assertIsNone(expenses.parent)
+        self.assertIs(expenses.children[0].parent, expenses)
+        self.assertLess(expenses.indent, expenses.children[0].indent)
+        self.assertEqual(expenses.children[1].account, 'Expenses:Tips')
+        self.assertEqual(top[0].account, 'Assets:Bank:Cheque')
+
+    def test_own_postings(self):
+        top = balance.tree({'Expenses': D(1), 'Expenses:Food': D(2)})
+        self.assertEqual(shape(top), [('Expenses', 3, [('Food', 2, [])])])
+
+    def test_same_as_ledger(self):
+        # minus the dollar signs, which balance() does not understand
+        self.assertEqual(
+            shape(balance.balance(OUTPUT.replace('$', ''))),
+            shape(balance.tree({
+                'Assets:Bank:Cheque': D(-10),
+                'Expenses:Food': D(7),
+                'Expenses:Tips': D(3),
+                'Equity:A': D(5),
+                'Equity:B': D(-5),
+            }))
+        )
+
+    def test_balance(self):
+        output = OUTPUT.replace('$', '')
+        top = balance.balance(StringIO.StringIO(output))
+        self.assertEqual(shape(top), shape(balance.balance(output)))
+        self.assertEqual(
+            [node.account for node in top[1].children],
+            ['Equity:A', 'Equity:B']
+        )
+        self.assertEqual(top[2].children[0].parent.account, 'Expenses')
+
+    def test_stops_at_total(self):
+        lines = iter(OUTPUT.replace('$', '').splitlines(True))
+        balance.balance(lines)
+        self.assertEqual(next(lines).strip(), '0')  # the total is left
+
+    def test_pipe(self):
+        output = OUTPUT.replace('$', '')
+        proc = subprocess.Popen(
+            [sys.executable, '-c',
+             'import sys; sys.stdout.write({!r})'.format(output)],
+            stdout=subprocess.PIPE
+        )
+        top = balance.balance(iter(proc.stdout.readline, ''))
+        rest, _ = proc.communicate()
+        self.assertEqual(shape(top), shape(balance.balance(output)))
+        self.assertEqual(rest.strip(), '0')  # the total is left
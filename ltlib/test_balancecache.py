@@ -0,0 +1,106 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import decimal
+import os
+import shutil
+import tempfile
+import unittest
+
+from . import balancecache
+from . import journal
+
+D = decimal.Decimal
+
+ENTRY = '''2012/06/{:02}  Lunch
+  Assets:Bank  $-{}
+  Expenses:Food  ${}
+
+'''
+
+
+class BalanceCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache = balancecache.BalanceCache(os.path.join(self.dir, 'c'))
+        self.path = os.path.join(self.dir, 'out.dat')
+        self.write(1, 10)
+        self.read = []
+        self._read = journal.read
+
+        def read(lines):
+            lines = list(lines)
+            self.read.extend(lines)
+            return self._read(lines)
+        journal.read = read
+
+    def tearDown(self):
+        journal.read = self._read
+        shutil.rmtree(self.dir)
+
+    def write(self, day, amount, mode='a', text=None):
+        with open(self.path, mode) as fh:
+            fh.write(text or ENTRY.format(day, amount, amount))
+
+    def totals(self):
+        return self.cache.totals([self.path])
+
+    def test_append(self):
+        self.assertEqual(self.totals(),
+                         {'Assets:Bank': -10, 'Expenses:Food': 10})
+        self.write(2, 5)
+        del self.read[:]
+        self.assertEqual(self.totals(),
+                         {'Assets:Bank': -15, 'Expenses:Food': 15})
+        self.assertEqual(self.read[0], '2012/06/02  Lunch\n')
+        del self.read[:]
+        self.assertEqual(self.totals()['Expenses:Food'], 15)
+        self.assertEqual(self.read, [])
+
+    def test_incomplete_entry(self):
+        self.write(2, 5, text='2012/06/02  Lunch\n  Assets:Bank  $-5\n')
+        self.assertEqual(self.totals(),
+                         {'Assets:Bank': -15, 'Expenses:Food': 10})
+        self.write(2, 5, text='  Expenses:Food\n\n')
+        self.assertEqual(self.totals(),
+                         {'Assets:Bank': -15, 'Expenses:Food': 15})
+        self.assertEqual(self.totals(),
+                         {'Assets:Bank': -15, 'Expenses:Food': 15})
+
+    def test_rewritten(self):
+        self.totals()
+        self.write(1, 20, 'w')  # same size, different contents
+        self.write(2, 5)
+        self.assertEqual(self.totals(),
+                         {'Assets:Bank': -25, 'Expenses:Food': 25})
+        self.write(3, 7, 'w')  # shorter
+        self.assertEqual(self.totals(),
+                         {'Assets:Bank': -7, 'Expenses:Food': 7})
+
+    def test_many_files(self):
+        other = os.path.join(self.dir, 'other.dat')
+        with open(other, 'w') as fh:
+            fh.write(ENTRY.format(1, '2.50', '2.50'))
+        self.assertEqual(self.cache.totals([self.path, other]),
+                         {'Assets:Bank': D('-12.50'),
+                          'Expenses:Food': D('12.50')})
+
+    def test_disabled(self):
+        self.cache = balancecache.BalanceCache(None)
+        self.totals()
+        self.write(2, 5)
+        self.assertEqual(self.totals()['Assets:Bank'], -15)
+        self.assertFalse(os.path.exists(os.path.join(self.dir, 'c')))
@@ -0,0 +1,143 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+import decimal
+import operator
+import unittest
+
+from . import index
+from . import parse
+from . import rule
+from . import test_index
+
+try:
+    from . import batch
+except ImportError:  # NumPy is not installed
+    batch = None
+
+amount_rules = r"""
+lt 4.505 then to Expenses:A 100
+le 4.5 then to Expenses:B 100
+eq 4.500 then to Expenses:C 100
+eq 4.505 then to Expenses:D 100
+ne 4.505 then to Expenses:E 100
+ge 1000000000000000000000 then to Expenses:F 100
+gt -1000000000000000000000 then to Expenses:G 100
+ne 12.00 desc coles then to Expenses:H 100
+"""
+
+amounts = [
+    '4.50', '4.5', '4.51', '4.505', '-4.50', '0', '12', '1E+3',
+    '0.0000001', '123456789012345678901234', 'Infinity', None,
+]
+
+
+class Counting(rule.Condition):
+    """Condition that records each transaction it is checked against."""
+    cost = 1
+
+    def __init__(self, *args, **kwargs):
+        self.checked = []
+        super(Counting, self).__init__(*args, **kwargs)
+
+    def match(self, xn):
+        self.checked.append(xn)
+        return self.value
+
+
+@unittest.skipIf(batch is None, 'NumPy is not installed')
+class XnBatchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.rules = parse.file2rules(
+            (test_index.rules + amount_rules).splitlines()
+        )
+        on = datetime.date(2012, 7, 1)
+        self.rules.extend(
+            rule.Rule(
+                rule.DateCondition(op=op, value=on),
+                rule.DestinationOutcome(value=op.__name__, score=10)
+            )
+            for op in index.comparison_intervals
+        )
+        self.rules.append(rule.Rule(
+            rule.DateCondition(op=operator.ge, value=on),
+            rule.DateCondition(op=operator.lt, value=on.replace(day=2)),
+            rule.AmountCondition(op=operator.gt, value=decimal.Decimal(0)),
+            rule.DestinationOutcome(value='July 1', score=10)
+        ))
+        self.xns = [test_index.mkxn(**x) for x in test_index.xns] + [
+            test_index.mkxn('Coles', amount, src='Assets:Bank')
+            for amount in amounts
+        ]
+        for i, x in enumerate(self.xns):
+            x.date += datetime.timedelta(days=i % 3 - 1)
+        self.xns[-1].date = None
+
+    def check(self, xns, rules):
+        expected = [test_index.normalise(x.match_rules(rules)) for x in xns]
+        pairs = list(batch.match_rules(xns, rules, size=5))
+        self.assertEqual([x for x, _ in pairs], xns)
+        self.assertEqual(
+            [test_index.normalise(scores) for _, scores in pairs],
+            expected
+        )
+
+    def test_match_rules(self):
+        self.check(self.xns, self.rules)
+        self.check(self.xns, index.RuleIndex(self.rules))
+
+    def test_order(self):
+        passes = Counting(value=True)
+        fails = Counting(value=False)
+        r = rule.Rule(
+            passes, fails, rule.DestinationOutcome(value='X', score=10)
+        )
+        r.reorder({0: (10, 10), 1: (10, 0)})
+        self.assertEqual(r.order, [fails, passes])
+        b = batch.XnBatch(self.xns)
+        results = b.match_rules([r])
+        incomplete = [x for x, s in zip(self.xns, results) if s is not None]
+        self.assertEqual(fails.checked, incomplete)
+        self.assertEqual(passes.checked, [])
+
+    def test_complete(self):
+        x = test_index.mkxn('coffee', '4.50', 'Assets:Bank', 'Expenses:Food')
+        self.assertEqual(batch.XnBatch([x]).match_rules(self.rules), [None])
+
+    def test_columns(self):
+        b = batch.XnBatch(self.xns)
+        self.assertEqual(len(b), len(self.xns))
+        self.assertEqual(b.scale, batch.MAX_SCALE)
+        i = len(test_index.xns)
+        self.assertEqual(
+            list(b.amounts[i:i + 4]),
+            [4500000, 4500000, 4510000, 4505000]
+        )
+        self.assertEqual(
+            list(b.exact_amounts[i + 7:]),
+            [True, False, False, False, False]
+        )
+        self.assertEqual(list(b.exact_dates[-2:]), [True, False])
+        self.assertEqual(
+            [b.accounts[a] for a in b.dst_accounts],
+            [x.dst[0].account for x in self.xns if x.dst]
+        )
+        self.assertEqual(b.descs[b.desc_ids[0]], self.xns[0].desc)
+        self.assertEqual(
+            b.desc_ids[[x.desc is None for x in self.xns].index(True)],
+            -1
+        )
@@ -15,7 +15,10 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import datetime
+import json
 import os
+import shutil
+import tempfile
 import unittest
 
 from . import config
@@ -86,6 +89,17 @@ class ConfigTestCase(unittest.TestCase):
             os.path.normpath(os.path.expanduser('~/ledger'))
         )
 
+    def test_cachedir(self):
+        self.assertEqual(
+            self.config.cachedir(),
+            os.path.expanduser('~/.cache/ledgertools')
+        )
+        self.assertIsNone(
+            config.Config(
+                text='{"cachedir": null, "accounts": {}}'
+            ).cachedir()
+        )
+
     def test_outdir(self):
         # no account
         self.assertEqual(
@@ -103,6 +117,22 @@ class ConfigTestCase(unittest.TestCase):
             os.path.expanduser('~/ledger/AccountB')
         )
 
+    def test_outdir_remembered(self):
+        root = tempfile.mkdtemp()
+        try:
+            c = config.Config(text=json.dumps({
+                'rootdir': root, 'outdir': 'out', 'accounts': {},
+            }))
+            outdir = c.outdir()
+            self.assertTrue(os.path.isdir(outdir))
+            os.rmdir(outdir)
+            self.assertEqual(c.outdir(), outdir)
+            self.assertFalse(os.path.exists(outdir))  # not checked again
+            self.assertEqual(c.outdir(acc='Assets:AccountA'), outdir)
+            self.assertTrue(os.path.isdir(outdir))
+        finally:
+            shutil.rmtree(root)
+
     def test_outpat(self):
         # no account
         self.assertEqual(
@@ -120,6 +150,17 @@ class ConfigTestCase(unittest.TestCase):
             os.path.expanduser('~/ledger/AccountB/AccountB.dat')
         )
 
+    def test_fy(self):
+        self.assertEqual(config.fy(datetime.date(2012, 6, 30)), 2012)
+        self.assertEqual(config.fy(datetime.date(2012, 7, 1)), 2013)
+
+    def test_outpat_glob(self):
+        self.assertEqual(
+            config.outpat_glob('/l/{fy}/{year}-{month}-{date.day:02}.dat'),
+            '/l/*/*-*-*.dat'
+        )
+        self.assertEqual(config.outpat_glob('/l/out.dat'), '/l/out.dat')
+
     def test_rulesdir(self):
         # no account
         self.assertEqual(
@@ -0,0 +1,97 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+import decimal
+import os
+import shutil
+import tempfile
+import unittest
+
+from . import dedup
+from . import journal
+from . import xn
+
+D = decimal.Decimal
+
+
+def mkxn(day, desc, amount):
+    amount = D(amount)
+    return xn.Xn(
+        date=datetime.date(2012, 6, day),
+        desc=desc,
+        amount=abs(amount),
+        src=[xn.Endpoint('Assets:Bank', amount)],
+    )
+
+
+class DedupIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cachedir = os.path.join(self.dir, 'cache')
+        self.path = os.path.join(self.dir, 'out.dat')
+        self.write([('1', 'Coffee', '-4.50'), ('1', 'Coffee', '-4.50'),
+                    ('2', 'Rent', '-400')])
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, rows, mode='w'):
+        with open(self.path, mode) as fh:
+            for day, desc, amount in rows:
+                x = mkxn(int(day), desc, amount)
+                x.dst = [xn.Endpoint('Expenses:Misc', -x.src[0].amount)]
+                print >> fh, x.ledger()
+
+    def test_seen(self):
+        index = dedup.DedupIndex([self.path])
+        incoming = [
+            mkxn(1, '  COFFEE ', '-4.5'),
+            mkxn(2, 'Rent', '-400.00'),
+            mkxn(1, 'Coffee', '-4.50'),
+            mkxn(1, 'Coffee', '-4.50'),  # a third coffee is new
+            mkxn(2, 'Rent', '400'),      # so is a credit
+            mkxn(3, 'Rent', '-400'),
+        ]
+        kept = list(index.filter(incoming))
+        self.assertEqual(kept, incoming[3:])
+        self.assertEqual(index.skipped, 3)
+
+    def test_missing_file(self):
+        index = dedup.DedupIndex([os.path.join(self.dir, 'nothing.dat')])
+        self.assertFalse(index.seen(mkxn(1, 'Coffee', '-4.50')))
+
+    def test_cache(self):
+        dedup.DedupIndex([self.path], self.cachedir)
+        self.assertEqual(len(os.listdir(self.cachedir)), 1)
+        read_path = journal.read_path
+        journal.read_path = None  # the cached fingerprints must be used
+        try:
+            index = dedup.DedupIndex([self.path], self.cachedir)
+        finally:
+            journal.read_path = read_path
+        self.assertTrue(index.seen(mkxn(2, 'Rent', '-400')))
+
+        self.write([('3', 'Gas', '-60')], 'a')
+        index = dedup.DedupIndex([self.path], self.cachedir)
+        self.assertTrue(index.seen(mkxn(3, 'Gas', '-60')))
+
+    def test_amount_key(self):
+        self.assertEqual(dedup.amount_key(D('12.50')), '12.5')
+        self.assertEqual(dedup.amount_key(D('-400.00')), '-400')
+        self.assertEqual(dedup.amount_key(D('400')), '400')
+        self.assertNotEqual(dedup.amount_key(D('1E+2')),
+                            dedup.amount_key(D('1')))
@@ -0,0 +1,268 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+import decimal
+import operator
+import re
+import unittest
+
+from . import index
+from . import parse
+from . import rule
+from . import xn
+
+rules = r"""
+# comments and blank lines are ignored
+
+eq 4.50 then to Expenses:Coffee 9000
+desc "^woolworths" then to Expenses:Groceries 8000
+desc "COLES \d+" then to Expenses:Groceries 7000
+desc "x" then to Expenses:Misc 100
+desc "ab|cd" then to Expenses:Misc 200
+from Assets:Bank:Cheque desc salary then to Income:Salary 9000
+from Assets:Bank:Cheque then to Expenses:Unknown 1000
+from :Cheque then to Expenses:Unknown 500
+from Assets::Cheque then to Expenses:Unknown 500
+to Assets:Bank: then from Income:Other 2000
+to :Savings: then from Income:Interest 3000
+gt 1000 then drop 9000
+ge 10 le 20 then to Expenses:Lunch 4000
+lt 0 then drop 1000
+ne 4.50 desc coffee then to Expenses:Coffee 6000
+desc coffee then to Expenses:Coffee 5000
+then to Expenses:Fallback 10
+"""
+
+xns = [
+    dict(desc='WOOLWORTHS 1234', amount='45.10', src='Assets:Bank:Cheque'),
+    dict(desc='Coles 567', amount='12.00', src='Assets:Bank:Cheque'),
+    dict(desc='Coffee Shop', amount='4.50', src='Assets:Bank:Cheque'),
+    dict(desc='coffee shop', amount='4.60', src='Assets:Bank:Cheque'),
+    dict(desc='SALARY ACME', amount='2000.00', dst='Assets:Bank:Cheque'),
+    dict(desc='interest', amount='0.12', dst='Assets:Bank:Savings:Bonus'),
+    dict(desc='interest', amount='0.12', dst='Assets:Bank:Savings'),
+    dict(desc='xyzzy', amount='20', src='Assets:Other:Bank:Cheque'),
+    dict(desc='abc', amount='10', src='Cheque'),
+    dict(desc='', amount='1000', src='Liabilities:Card'),
+    dict(desc=None, amount=None, src='Assets:Bank:Cheque'),
+]
+
+
+def mkxn(desc, amount, src=None, dst=None):
+    amount = None if amount is None else decimal.Decimal(amount)
+    return xn.Xn(
+        date=datetime.date(2012, 7, 1),
+        desc=desc,
+        amount=amount,
+        src=[xn.Endpoint(src, -amount if amount else None)] if src else None,
+        dst=[xn.Endpoint(dst, amount)] if dst else None,
+    )
+
+
+def normalise(scores):
+    return dict(
+        (k, sorted(v.scores())) for k, v in scores.viewitems()
+    )
+
+
+class RuleIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.rules = parse.file2rules(rules.splitlines())
+        self.index = index.RuleIndex(self.rules)
+
+    def test_len_iter(self):
+        self.assertEqual(len(self.index), len(self.rules))
+        self.assertEqual(list(self.index), self.rules)
+
+    def test_candidates_superset(self):
+        for kwargs in xns:
+            x = mkxn(**kwargs)
+            candidates = self.index.candidates(x)
+            matched = [r for r in self.rules if r.match(x)]
+            self.assertTrue(set(matched) <= set(candidates), kwargs)
+            # candidates are in ruleset order
+            self.assertEqual(
+                candidates,
+                sorted(candidates, key=self.rules.index)
+            )
+
+    def test_match_rules_identical(self):
+        for kwargs in xns:
+            self.assertEqual(
+                normalise(mkxn(**kwargs).match_rules(self.rules)),
+                normalise(mkxn(**kwargs).match_rules(self.index)),
+                kwargs
+            )
+
+    def test_answered(self):
+        expected = [
+            [r for r in self.rules if r.match(mkxn(**kwargs))]
+            for kwargs in xns
+        ]
+        checked = set()
+        for r in self.rules:
+            for c in r.conditions:
+                def match(x, c=c, match=c.match):
+                    checked.add(c)
+                    return match(x)
+                c.match = match
+        self.assertEqual(
+            [list(self.index.matching(mkxn(**kwargs))) for kwargs in xns],
+            expected
+        )
+        # the amount, pattern and account buckets answer for themselves
+        answered = set(
+            c for i in (0, 4, 6, 7, 8, 9, 10, 11, 12, 13)
+            for c in self.rules[i].conditions
+        )
+        self.assertEqual(checked & answered, set())
+        # description literals only narrow the candidates
+        self.assertIn(self.rules[1].conditions[0], checked)
+        # amounts that the tables cannot place are checked
+        x = mkxn(desc='', amount='0')
+        x.amount = 1001
+        self.assertEqual(
+            list(self.index.matching(x)),
+            [self.rules[11], self.rules[16]]
+        )
+        self.assertIn(self.rules[11].conditions[0], checked)
+
+    def test_description_literal(self):
+        lit = lambda x: index.description_literal(re.compile(x, re.I))
+        self.assertEqual(lit('^Woolworths'), 'woolworths')
+        self.assertEqual(lit(r'COLES \d+'), 'coles ')
+        self.assertEqual(lit('ab+cdef'), 'cdef')
+        self.assertIsNone(lit('ab|cd'))
+        self.assertIsNone(lit('foo|barbaz'))
+        self.assertIsNone(lit('x'))
+
+
+class IntervalTableTestCase(unittest.TestCase):
+    bounds = [
+        [('lt', '0')],
+        [('le', '0')],
+        [('eq', '4.50')],
+        [('ne', '4.5')],
+        [('ge', '10'), ('le', '20')],
+        [('gt', '10'), ('lt', '10.00')],  # empty
+        [('ne', '0'), ('ne', '20'), ('lt', '100')],
+        [('gt', '20'), ('gt', '1000'), ('le', '1000.0')],
+    ]
+    values = [
+        '-1', '0', '0.00', '4', '4.5', '4.500', '4.6', '10', '10.0000001',
+        '20', '50', '100', '1000', '1001',
+    ]
+
+    def setUp(self):
+        self.rules = [
+            rule.Rule(*[
+                rule.AmountCondition(
+                    value=decimal.Decimal(value),
+                    op=getattr(operator, op)
+                ) for op, value in conditions
+            ])
+            for conditions in self.bounds
+        ]
+        self.table = index.IntervalTable(
+            (i, index.interval_set(r, rule.AmountCondition))
+            for i, r in enumerate(self.rules)
+        )
+
+    def test_lookup(self):
+        for value in self.values:
+            x = mkxn(desc='', amount=value)
+            self.assertEqual(
+                self.table.lookup(x.amount),
+                tuple(
+                    i for i, r in enumerate(self.rules)
+                    if all(c.match(x) for c in r.conditions)
+                ),
+                value
+            )
+
+    def test_unorderable(self):
+        keys = range(len(self.rules))
+        self.assertEqual(self.table.lookup(decimal.Decimal('NaN')), keys)
+        self.assertEqual(self.table.lookup(datetime.date.today()), keys)
+
+    def test_interval_set(self):
+        dates = rule.Rule(
+            rule.DateCondition(value=datetime.date(2012, 7, 1), op=operator.ge)
+        )
+        self.assertIsNone(index.interval_set(dates, rule.AmountCondition))
+        self.assertEqual(
+            index.interval_set(dates, rule.DateCondition),
+            [(datetime.date(2012, 7, 1), True, None, False)]
+        )
+        nan = rule.Rule(
+            rule.AmountCondition(value=decimal.Decimal('NaN'), op=operator.eq)
+        )
+        self.assertIsNone(index.interval_set(nan, rule.AmountCondition))
+        self.assertEqual(
+            index.interval_set(self.rules[5], rule.AmountCondition), []
+        )
+
+
+class DescriptionMatcherTestCase(unittest.TestCase):
+    patterns = [
+        'coffee', '^bar', r'x$', '', '(foo)\\1', '(?x) s p a c e',
+    ] + ['p{}q'.format(i) for i in xrange(250)]
+
+    def setUp(self):
+        self.compiled = [re.compile(x, re.I) for x in self.patterns]
+        self.matcher = index.DescriptionMatcher(enumerate(self.compiled))
+
+    def test_match(self):
+        for desc in [
+            'COFFEE bar', 'bar coffee fOOfoo', 'space x\n', 'p17q p249Q',
+            'p{}q'.format(len(self.patterns)), '',
+        ]:
+            self.assertEqual(
+                self.matcher.match(desc),
+                set(i for i, x in enumerate(self.compiled) if x.search(desc)),
+                desc
+            )
+
+    def test_none(self):
+        self.assertEqual(self.matcher.match(None), set())
+
+
+class AccountTrieTestCase(unittest.TestCase):
+    values = [
+        'Assets', 'Assets:Bank', 'Assets:Bank:', ':Bank', ':Bank:',
+        'Assets::Cheque', '::Cheque', 'Assets::', '::', ':', ':::',
+        'Assets:::Cheque', 'Assets:B.nk', 'Expenses:Food', 'Bank',
+    ]
+    accounts = [
+        'Assets', 'Assets:Bank', 'Assets:Bank:Cheque', 'Assets:Bank:x:y',
+        'Assets:Other Bank:Cheque', 'Assets::Cheque', 'X:Bank:Cheque',
+        'Bank', 'Assets:B-nk:Cheque', 'Assets:Bank\n', ':Bank', 'Cheque',
+        'Assets:Bank:', 'Expenses:Food:Bank:Cheque', '', ':',
+    ]
+
+    def test_match(self):
+        conditions = [rule.SourceCondition(value=x) for x in self.values]
+        trie = index.AccountTrie(enumerate(conditions))
+        for account in self.accounts * 2:  # second time from cache
+            self.assertEqual(
+                trie.match(account),
+                set(
+                    i for i, c in enumerate(conditions)
+                    if c.re.search(account)
+                ),
+                account
+            )
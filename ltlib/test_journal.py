@@ -0,0 +1,111 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+import decimal
+import unittest
+
+from . import journal
+from . import xn
+
+D = decimal.Decimal
+
+
+class JournalTestCase(unittest.TestCase):
+    def test_round_trip(self):
+        x = xn.Xn(
+            date=datetime.date(2012, 6, 1),
+            desc='Lunch  at   Cafe',
+            amount=D('12.50'),
+            src=[xn.Endpoint('Assets:Bank', D('-12.50'))],
+            dst=[
+                xn.Endpoint('Expenses:Food', D('11.50')),
+                xn.Endpoint('Expenses:Tips', D('1')),
+            ],
+        )
+        text = x.ledger() + '\n' + x.ledger()
+        xns = list(journal.read(text.splitlines(True)))
+        self.assertEqual(len(xns), 2)
+        for y in xns:
+            self.assertEqual(y.date, x.date)
+            self.assertEqual(y.desc, x.desc)
+            self.assertEqual(y.amount, x.amount)
+            self.assertEqual(
+                [(ep.account, ep.amount) for ep in y.src + y.dst],
+                [(ep.account, ep.amount) for ep in x.src + x.dst]
+            )
+
+    def test_hand_written(self):
+        text = '''; a comment
+account Expenses:Coffee Shop
+
+2012-7-3 * (1001) Coffee and cake
+    Expenses:Coffee Shop    $1,004.50  ; a note
+    ; another note
+\tAssets:Bank
+
+2012/07/04=2012/07/05 Refund
+    Assets:Bank  $5
+    Expenses:Coffee Shop
+'''
+        xns = list(journal.read(text.splitlines(True)))
+        self.assertEqual(len(xns), 2)
+        first, second = xns
+        self.assertEqual(first.date, datetime.date(2012, 7, 3))
+        self.assertEqual(first.desc, 'Coffee and cake')
+        self.assertEqual(first.amount, D('1004.50'))
+        self.assertEqual(
+            [(ep.account, ep.amount) for ep in first.src],
+            [('Assets:Bank', D('-1004.50'))]
+        )
+        self.assertEqual(
+            [(ep.account, ep.amount) for ep in first.dst],
+            [('Expenses:Coffee Shop', D('1004.50'))]
+        )
+        self.assertEqual(second.date, datetime.date(2012, 7, 4))
+        self.assertEqual(second.src[0].account, 'Expenses:Coffee Shop')
+        self.assertEqual(second.amount, D(5))
+
+    def test_no_amounts(self):
+        text = '2012/01/01 Opening\n  Assets:Cash\n\n2012/01/02 Note\n'
+        opening, note = journal.read(text.splitlines(True))
+        self.assertEqual(opening.src, [])
+        self.assertEqual(
+            [(ep.account, ep.amount) for ep in opening.dst],
+            [('Assets:Cash', 0)]
+        )
+        self.assertIsInstance(opening.amount, D)
+        self.assertEqual((note.src, note.dst), ([], []))
+        self.assertIsInstance(note.amount, D)
+
+    def test_errors(self):
+        for text in [
+            '2012/02/30  Bad date\n  A  $1\n  B\n',
+            '2012/02/03  Bad amount\n  A  1 AUD\n  B\n',
+            '2012/02/03  Two missing\n  A  $1\n  B\n  C\n',
+        ]:
+            with self.assertRaises(journal.JournalError):
+                list(journal.read(text.splitlines(True)))
+
+
+class SelectTestCase(unittest.TestCase):
+    def test_select(self):
+        accounts = ['Assets:Bank', 'Expenses:Food', 'Income:Salary']
+        self.assertEqual(journal.select(accounts), accounts)
+        self.assertEqual(
+            journal.select(accounts, ['^expenses', 'salary']),
+            ['Expenses:Food', 'Income:Salary']
+        )
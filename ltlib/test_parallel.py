@@ -0,0 +1,75 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import tempfile
+import unittest
+
+from . import index
+from . import parallel
+from . import parse
+from . import test_index
+from .readers import MappedCSV
+from .readers import test_FastCSV
+
+
+class ParallelTestCase(unittest.TestCase):
+    def test_chunks(self):
+        self.assertEqual(
+            list(parallel.chunks(xrange(7), 3)),
+            [[0, 1, 2], [3, 4, 5], [6]]
+        )
+        self.assertEqual(list(parallel.chunks([], 3)), [])
+
+    def test_match_rules(self):
+        rules = index.RuleIndex(
+            parse.file2rules(test_index.rules.splitlines())
+        )
+        xns = [test_index.mkxn(**x) for x in test_index.xns * 20]
+        pairs = list(parallel.match_rules(xns, rules, 2, chunksize=3))
+        self.assertEqual([x for x, _ in pairs], xns)
+        for x, scores in pairs:
+            self.assertEqual(
+                test_index.normalise(scores),
+                test_index.normalise(x.match_rules(rules))
+            )
+
+    def test_match_spans(self):
+        rules = index.RuleIndex(
+            parse.file2rules(test_index.rules.splitlines())
+        )
+        text = test_FastCSV.amount_csv
+        expected = test_FastCSV.read(MappedCSV.Reader, text)
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(text)
+            f.flush()
+            reader = MappedCSV.Reader(
+                file=open(f.name), account='Assets:Bank', chunksize=8
+            )
+            pairs = parallel.match_spans(reader, rules, 2)
+            for summary in expected:
+                if isinstance(summary, type):
+                    # reading stops at the first error
+                    self.assertRaises(summary, next, pairs)
+                    break
+                x, scores = next(pairs)
+                self.assertEqual(test_FastCSV.summary(x), summary)
+                self.assertEqual(
+                    test_index.normalise(scores),
+                    test_index.normalise(x.match_rules(rules))
+                )
+            else:
+                self.fail('no error raised')
+            self.assertRaises(StopIteration, next, pairs)
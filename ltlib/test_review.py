@@ -0,0 +1,194 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import copy
+import datetime
+import decimal
+import StringIO
+import tempfile
+import unittest
+
+from . import review
+from . import score
+from . import ui
+from . import xn
+
+
+class ReviewTestCase(unittest.TestCase):
+    def test_roundtrip(self):
+        amount = decimal.Decimal('12.30')
+        xns = [
+            xn.Xn(
+                date=datetime.date(2012, 7, 1),
+                desc='Caf\xc3\xa9 \xe9',  # utf-8 and latin-1 bytes
+                amount=amount,
+                src=[xn.Endpoint('Assets:Bank', -amount)],
+            ),
+            xn.Xn(),
+        ]
+        fh = StringIO.StringIO()
+        for x in xns:
+            review.dump(x, fh)
+        fh.seek(0)
+        loaded = [x for x, prevxn in review.load(fh)]
+        self.assertEqual(len(loaded), 2)
+        self.assertEqual(loaded[0].date, xns[0].date)
+        self.assertEqual(loaded[0].desc, xns[0].desc)
+        self.assertIsInstance(loaded[0].desc, str)
+        self.assertEqual(loaded[0].amount, amount)
+        self.assertEqual(loaded[0].src[0].account, 'Assets:Bank')
+        self.assertEqual(loaded[0].src[0].amount, -amount)
+        self.assertIsNone(loaded[0].dst)
+        self.assertEqual(
+            review.xn_to_dict(loaded[1]),
+            review.xn_to_dict(xns[1])
+        )
+
+
+class ScriptedUI(ui.UI):
+    """Interactive UI that gives a fixed sequence of answers."""
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.prompts = []
+
+    def show(self, msg):
+        pass
+
+    def input(self, filter_fn, prompt):
+        self.prompts.append(prompt)
+        return filter_fn(self.answers.pop(0))
+
+
+def scores(**outcomes):
+    """Return outcomes with one scored value each."""
+    result = {}
+    for key, (value, points) in outcomes.iteritems():
+        result[key] = score.ScoreSet()
+        result[key].append((value, points))
+    return result
+
+
+def debit(desc, amount):
+    amount = decimal.Decimal(amount)
+    return xn.Xn(
+        date=datetime.date(2012, 7, 1),
+        desc=desc,
+        amount=amount,
+        src=[xn.Endpoint('Assets:Bank', -amount)],
+    )
+
+
+def credit(desc, amount):
+    amount = decimal.Decimal(amount)
+    return xn.Xn(
+        date=datetime.date(2012, 7, 2),
+        desc=desc,
+        amount=amount,
+        dst=[xn.Endpoint('Assets:Bank', amount)],
+    )
+
+
+class BatchTestCase(unittest.TestCase):
+    def test_above_threshold(self):
+        x = debit('Lunch', '12.50')
+        x.apply_outcomes(scores(dst=('Expenses:Food', 9000)), ui.BatchUI())
+        x.complete(ui.BatchUI())
+        self.assertEqual(x.dst[0].account, 'Expenses:Food')
+        self.assertTrue(x.balance())
+
+    def test_below_threshold(self):
+        for points in (7000, 5000, 1000):
+            x = debit('Lunch', '12.50')
+            with self.assertRaises(ui.DeferWarning):
+                x.apply_outcomes(
+                    scores(dst=('Expenses:Food', points)), ui.BatchUI()
+                )
+
+    def test_drop(self):
+        x = debit('Lunch', '12.50')
+        x.apply_outcomes(scores(drop=(True, 9000)), ui.BatchUI())
+        self.assertTrue(x.dropped)
+        x = debit('Lunch', '12.50')
+        with self.assertRaises(ui.DeferWarning):
+            x.apply_outcomes(scores(drop=(True, 5000)), ui.BatchUI())
+
+    def test_unmatched(self):
+        with self.assertRaises(ui.DeferWarning):
+            debit('Lunch', '12.50').complete(ui.BatchUI())
+
+    def test_review(self):
+        # a statement of a transaction that needs input, a purchase,
+        # and a partial refund of the purchase that also needs input
+        statement = [
+            (debit('Lunch', '12.50'), scores(dst=('Expenses:Food', 5000))),
+            (debit('Shoes', '100.00'), scores(dst=('Expenses:Shoes', 9000))),
+            (credit('Refund', '25.00'),
+                scores(rebate=(True, 9000), drop=(True, 5000))),
+        ]
+        fh = StringIO.StringIO()
+        queue = review.QueueWriter(fh)
+        written = []
+        prevxn = None
+        for x, outcomes in statement:
+            original = copy.copy(x)
+            try:
+                x.apply_outcomes(outcomes, ui.BatchUI(), prevxn=prevxn)
+                x.complete(ui.BatchUI())
+            except ui.DeferWarning:
+                queue.dump(original, prevxn)
+                prevxn = None
+                continue
+            written.append(x)
+            prevxn = x
+        self.assertEqual([x.desc for x in written], ['Shoes'])
+
+        fh.seek(0)
+        records = list(review.load(fh))
+        self.assertEqual([x.desc for x, prevxn in records],
+                         ['Lunch', 'Refund'])
+        # the refund is rebated against the shoes, not the lunch
+        refund, prevxn = records[1]
+        self.assertEqual(prevxn.desc, 'Shoes')
+        refund.apply_outcomes(statement[2][1], ScriptedUI(['n']),
+                              prevxn=prevxn)
+        self.assertEqual(
+            [(ep.account, ep.amount) for ep in refund.src],
+            [('Expenses:Shoes', decimal.Decimal('-25.00'))]
+        )
+        self.assertTrue(refund.balance())
+
+        lunch, prevxn = records[0]
+        self.assertIsNone(prevxn)
+        uio = ScriptedUI(['y'])
+        lunch.apply_outcomes(statement[0][1], uio)
+        self.assertEqual(lunch.dst[0].account, 'Expenses:Food')
+        self.assertEqual(uio.prompts,
+                         ['Is the account Expenses:Food? [y/n]: '])
+
+    def test_queue_once(self):
+        fh = tempfile.NamedTemporaryFile()
+        lunch = debit('Lunch', '12.50')
+        for run in range(2):
+            with open(fh.name, 'a') as f:
+                queue = review.QueueWriter(f)
+                queue.dump(lunch)
+                queue.dump(lunch)  # two identical lunches
+                queue.dump(credit('Refund', '1.00'))
+        with open(fh.name) as f:
+            self.assertEqual(
+                [x.desc for x, prevxn in review.load(f)],
+                ['Lunch', 'Lunch', 'Refund']
+            )
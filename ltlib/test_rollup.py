@@ -0,0 +1,183 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+import decimal
+import pickle
+import random
+import unittest
+
+from . import journal
+from . import rollup
+from . import xn
+
+D = decimal.Decimal
+
+
+def mkxn(date, amount):
+    return xn.Xn(
+        date=date,
+        desc='Transfer',
+        amount=amount,
+        src=[xn.Endpoint('Assets:Bank', -amount)],
+        dst=[xn.Endpoint('Expenses:Misc', amount)],
+    )
+
+
+def brute_total(xns, account, begin=None, end=None):
+    """Sum an account's postings one by one."""
+    return sum(
+        ep.amount
+        for x in xns
+        if (begin is None or x.date >= begin)
+        and (end is None or x.date < end)
+        for ep in x.src + x.dst
+        if ep.account == account
+    )
+
+
+class RollupTestCase(unittest.TestCase):
+    def setUp(self):
+        rand = random.Random(7)
+        start = datetime.date(2010, 5, 20)
+        self.xns = [
+            mkxn(start + datetime.timedelta(rand.randrange(1200)),
+                 D(rand.randrange(1, 100000)) / 100)
+            for i in range(500)
+        ]
+        self.rollup = rollup.Rollup()
+        for x in self.xns:
+            self.rollup.add_xn(x)
+
+    def test_total(self):
+        rand = random.Random(8)
+        start = datetime.date(2010, 1, 1)
+        dates = [None] + [
+            start + datetime.timedelta(rand.randrange(1600))
+            for i in range(40)
+        ] + [datetime.date(2010, 7, 1), datetime.date(2012, 7, 1)]
+        for begin in dates:
+            for end in dates:
+                self.assertEqual(
+                    self.rollup.total('Assets:Bank', begin, end),
+                    brute_total(self.xns, 'Assets:Bank', begin, end),
+                    (begin, end)
+                )
+        self.assertEqual(self.rollup.total('Assets:Cash'), 0)
+
+    def test_totals(self):
+        self.assertEqual(self.rollup.totals(), {
+            'Assets:Bank': brute_total(self.xns, 'Assets:Bank'),
+            'Expenses:Misc': brute_total(self.xns, 'Expenses:Misc'),
+        })
+        self.assertEqual(self.rollup.accounts(),
+                         ['Assets:Bank', 'Expenses:Misc'])
+
+    def test_series(self):
+        begin = datetime.date(2011, 2, 15)
+        end = datetime.date(2012, 8, 1)
+        series = self.rollup.series(['Expenses:Misc'], 'fy', begin, end)
+        self.assertEqual(
+            [start for start, total in series],
+            [datetime.date(y, 7, 1) for y in (2010, 2011, 2012)]
+        )
+        bounds = [begin, datetime.date(2011, 7, 1),
+                  datetime.date(2012, 7, 1), end]
+        self.assertEqual(
+            [total for start, total in series],
+            [brute_total(self.xns, 'Expenses:Misc', lo, hi)
+             for lo, hi in zip(bounds, bounds[1:])]
+        )
+        months = self.rollup.series(['Assets:Bank', 'Expenses:Misc'],
+                                    'month')
+        self.assertEqual(months[0][0], datetime.date(2010, 5, 1))
+        self.assertTrue(all(total == 0 for start, total in months))
+        self.assertEqual(
+            rollup.period_label('month', months[0][0]), '2010-05'
+        )
+        self.assertEqual(rollup.period_label('fy', months[2][0]), 'FY2011')
+
+    def test_update(self):
+        first, second = rollup.Rollup(), rollup.Rollup()
+        for i, x in enumerate(self.xns):
+            (first if i % 2 else second).add_xn(x)
+        first = pickle.loads(pickle.dumps(first))
+        first.update(second)
+        self.assertEqual((first.first, first.last),
+                         (self.rollup.first, self.rollup.last))
+        self.assertEqual(first.days, self.rollup.days)
+        self.assertEqual(first.years, self.rollup.years)
+
+    def test_empty(self):
+        empty = rollup.Rollup()
+        self.assertEqual(empty.totals(), {})
+        self.assertEqual(empty.series(['Assets:Bank'], 'day'), [])
+
+
+class JournalTextTestCase(unittest.TestCase):
+    def setUp(self):
+        text = '''2012/06/30  Groceries
+  Assets:Bank  $-50
+  Expenses:Food  $50
+
+2012/06/01  Lunch
+  Assets:Bank  $-12.50
+  Expenses:Food  $11.50
+  Expenses:Tips  $1
+
+2012/07/01  Pay
+  Income:Salary  $-1000
+  Assets:Bank  $1000
+'''
+        self.rollup = rollup.Rollup()
+        for x in journal.read(text.splitlines(True)):
+            self.rollup.add_xn(x)
+
+    def test_accounts(self):
+        self.assertEqual(
+            self.rollup.accounts(),
+            ['Assets:Bank', 'Expenses:Food', 'Expenses:Tips', 'Income:Salary']
+        )
+
+    def test_total(self):
+        total = self.rollup.total
+        june, july = datetime.date(2012, 6, 1), datetime.date(2012, 7, 1)
+        self.assertEqual(total('Assets:Bank'), D('937.50'))
+        self.assertEqual(total('Assets:Bank', end=july), D('-62.50'))
+        self.assertEqual(total('Assets:Bank', begin=july), D('1000'))
+        self.assertEqual(
+            total('Assets:Bank', june + datetime.timedelta(1), july),
+            D('-50')
+        )
+        self.assertEqual(total('Assets:Bank', july, june), 0)
+        self.assertEqual(total('Assets:Cash'), 0)
+
+    def test_add(self):
+        self.assertEqual(self.rollup.total('Expenses:Tips'), 1)
+        self.rollup.add_xn(xn.Xn(
+            date=datetime.date(2012, 5, 1),
+            desc='Tip',
+            amount=D(2),
+            src=[xn.Endpoint('Assets:Bank', D(-2))],
+            dst=[xn.Endpoint('Expenses:Tips', D(2))],
+        ))
+        self.assertEqual(
+            self.rollup.totals(
+                journal.select(self.rollup.accounts(), ['tips']),
+                end=datetime.date(2012, 6, 1)),
+            {'Expenses:Tips': 2}
+        )
+        self.assertEqual(self.rollup.total('Expenses:Tips'), 3)
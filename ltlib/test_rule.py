@@ -0,0 +1,101 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+import decimal
+import operator
+import re
+import unittest
+
+from . import rule
+from . import xn
+
+D = decimal.Decimal
+
+
+def mkxn(desc, amount, src):
+    return xn.Xn(
+        date=datetime.date(2012, 7, 1),
+        desc=desc,
+        amount=amount,
+        src=[xn.Endpoint(src, -amount if amount else None)],
+    )
+
+
+xns = [
+    mkxn('Coffee Shop', D('4.50'), 'Assets:Bank'),
+    mkxn('coffee shop', D('5.00'), 'Assets:Bank'),
+    mkxn('Coffee Shop', D('4.50'), 'Assets:Bank:Cheque'),
+    mkxn('Coles 567', D('4.50'), 'Assets:Bank'),
+    mkxn('SALARY ACME', D('2000.00'), 'Assets:Bank'),
+    mkxn('', D('1'), 'Assets:Bank'),
+]
+
+
+class Counting(rule.Condition):
+    """Condition that records each transaction it is checked against."""
+    def __init__(self, *args, **kwargs):
+        self.cost = kwargs.pop('cost')
+        self.checked = []
+        super(Counting, self).__init__(*args, **kwargs)
+
+    def match(self, xn):
+        self.checked.append(xn)
+        return self.value
+
+
+class RuleTestCase(unittest.TestCase):
+    def setUp(self):
+        self.desc = rule.DescriptionCondition(value=re.compile('coffee', re.I))
+        self.src = rule.SourceCondition(value='Assets:Bank')
+        self.amount = rule.AmountCondition(
+            value=decimal.Decimal(5), op=operator.lt
+        )
+        self.outcome = rule.DestinationOutcome(value='Expenses', score=1)
+        self.rule = rule.Rule(self.desc, self.src, self.amount, self.outcome)
+
+    def test_static_order(self):
+        self.assertEqual(
+            self.rule.conditions, [self.desc, self.src, self.amount]
+        )
+        self.assertEqual(self.rule.order, [self.amount, self.src, self.desc])
+
+    def test_match(self):
+        matched = [x for x in xns if self.rule.match(x) is not None]
+        self.assertEqual(matched, [xns[0]])
+        for x in xns:
+            self.assertEqual(
+                self.rule.match(x) is not None,
+                all(c.match(x) for c in self.rule.conditions)
+            )
+
+    def test_short_circuit(self):
+        cheap = Counting(value=False, cost=1)
+        dear = Counting(value=True, cost=10)
+        r = rule.Rule(dear, cheap)
+        x = xns[0]
+        self.assertIsNone(r.match(x))
+        self.assertEqual((cheap.checked, dear.checked), ([x], []))
+
+    def test_reorder(self):
+        # the description condition rarely passes, so it is worth its cost
+        self.rule.reorder({0: (100, 1), 1: (100, 99), 2: (100, 90)})
+        self.assertEqual(self.rule.order, [self.desc, self.amount, self.src])
+        self.rule.reorder({1: (10, 10)})
+        self.assertEqual(self.rule.order, [self.amount, self.desc, self.src])
+        self.assertEqual(
+            self.rule.conditions, [self.desc, self.src, self.amount]
+        )
@@ -0,0 +1,89 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from . import parse
+from . import rulecache
+
+
+class RuleCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache = rulecache.RuleCache(os.path.join(self.dir, 'cache'))
+        self.path = os.path.join(self.dir, 'rules')
+        self.write('desc coffee then to Expenses:Coffee 9000\n')
+        self.parsed = 0
+        self._file2rules = parse.file2rules
+
+        def file2rules(file, name=None):
+            self.parsed += 1
+            return self._file2rules(file, name)
+        parse.file2rules = file2rules
+
+    def tearDown(self):
+        parse.file2rules = self._file2rules
+        shutil.rmtree(self.dir)
+
+    def write(self, text, mtime=None):
+        with open(self.path, 'w') as fh:
+            fh.write(text)
+        if mtime is not None:
+            os.utime(self.path, (mtime, mtime))
+
+    def load(self):
+        with open(self.path) as fh:
+            return self.cache.file2rules(fh)
+
+    def test_hit(self):
+        first = self.load()
+        second = self.load()
+        self.assertEqual(self.parsed, 1)
+        self.assertEqual(len(second), 1)
+        self.assertEqual(
+            second[0].conditions[0].value.pattern,
+            first[0].conditions[0].value.pattern
+        )
+
+    def test_source(self):
+        self.write('# comment\n\ndesc coffee then to Expenses:Coffee 9000\n')
+        self.load()
+        self.assertEqual(self.load()[0].source, (self.path, 3))
+
+    def test_changed_content(self):
+        self.write('desc coffee then to Expenses:Coffee 9000\n', 1000000)
+        self.load()
+        # same size and mtime, different content
+        self.write('desc toffee then to Expenses:Toffee 9000\n', 1000000)
+        rules = self.load()
+        self.assertEqual(self.parsed, 2)
+        self.assertEqual(rules[0].conditions[0].value.pattern, 'toffee')
+
+    def test_changed_size(self):
+        self.load()
+        self.write('desc coffee then to Expenses:Coffee 9000\nthen drop 1\n')
+        self.assertEqual(len(self.load()), 2)
+        self.assertEqual(self.parsed, 2)
+
+    def test_disabled(self):
+        self.cache = rulecache.RuleCache(None)
+        self.load()
+        self.load()
+        self.assertEqual(self.parsed, 2)
+        self.assertFalse(os.path.exists(os.path.join(self.dir, 'cache')))
@@ -0,0 +1,150 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import cPickle
+import os
+import shutil
+import StringIO
+import tempfile
+import unittest
+
+from . import parse
+from . import ruleprof
+from . import test_index
+
+rules = """
+desc coffee gt 4 then to Expenses:Coffee 9000
+# never matches
+desc nothing then drop 100
+then to Expenses:Fallback 10
+"""
+
+
+class ProfilerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.rules = parse.file2rules(rules.splitlines())
+        self.profiler = ruleprof.Profiler(self.rules)
+        self.xns = [test_index.mkxn(**x) for x in test_index.xns]
+
+    def match(self):
+        with self.profiler:
+            for x in self.xns:
+                x.match_rules(self.rules)
+
+    def test_counts(self):
+        self.match()
+        self.match()
+        counters = self.profiler.counters
+        coffee, nothing, fallback = self.rules
+        # complete transactions are not matched
+        n = sum(1 for x in self.xns if x.match_rules([]) is not None)
+        desc, gt = coffee.conditions
+        self.assertEqual(
+            [(counters[c].calls, counters[c].hits) for c in coffee.order],
+            [(2 * n, 2 * 8), (2 * 8, 2 * 2)]
+        )
+        self.assertEqual(coffee.order, [gt, desc])
+        self.assertEqual(counters[coffee].hits, 2 * 2)
+        self.assertEqual(counters[nothing].hits, 0)
+        self.assertEqual(counters[fallback].hits, 2 * n)
+        self.assertGreater(counters[coffee].seconds, 0)
+        # rules without a file name cannot be found again
+        self.assertEqual(self.profiler.stats(), {})
+
+    def test_restored(self):
+        self.match()
+        for r in self.rules:
+            self.assertNotIn('match', vars(r))
+            cPickle.dumps(r, cPickle.HIGHEST_PROTOCOL)
+
+    def test_report(self):
+        self.match()
+        out = StringIO.StringIO()
+        self.profiler.report(out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 8)
+        i = [j for j, line in enumerate(lines) if '<rules>:4' in line][0]
+        self.assertTrue(lines[i].endswith('(never matched)'))
+        self.assertIn("DescriptionCondition(value='nothing')", lines[i + 1])
+        self.assertIn('<rules>:5  (always matched)', out.getvalue())
+        self.assertEqual(lines[-1], '1 of 3 rules never matched')
+
+
+class StatsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'cache', 'rules.prof')
+        self.rules = parse.file2rules(rules.splitlines(), 'rules')
+        self.xns = [test_index.mkxn(**x) for x in test_index.xns]
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def profile(self, rules):
+        with ruleprof.Profiler(rules) as profiler:
+            for x in self.xns:
+                x.match_rules(rules)
+        return profiler.stats()
+
+    def test_stats(self):
+        stats = self.profile(self.rules)
+        coffee = self.rules[0]
+        n = sum(1 for x in self.xns if x.match_rules([]) is not None)
+        name = os.path.abspath('rules')
+        self.assertEqual(ruleprof.key(coffee, 1), (name, 2, 1))
+        self.assertEqual(stats, {
+            (name, 2, 0): (8, 2),
+            (name, 2, 1): (n, 8),
+            (name, 4, 0): (n, 0),
+        })
+
+    def test_save(self):
+        self.assertEqual(ruleprof.load(self.path), {})
+        stats = self.profile(self.rules)
+        ruleprof.save(stats, self.path)
+        self.assertEqual(ruleprof.load(self.path), stats)
+        # counts of the latest run replace earlier ones, others are kept
+        ruleprof.save({ruleprof.key(self.rules[0], 0): (1, 1)}, self.path)
+        saved = ruleprof.load(self.path)
+        self.assertEqual(saved[ruleprof.key(self.rules[0], 0)], (1, 1))
+        self.assertEqual(len(saved), len(stats))
+
+    def test_reorder(self):
+        coffee = self.rules[0]
+        desc, gt = coffee.conditions
+        self.assertEqual(coffee.order, [gt, desc])
+        # the description rarely passes, so it is worth its cost
+        stats = {
+            ruleprof.key(coffee, 0): (100, 1),
+            ruleprof.key(coffee, 1): (100, 90),
+        }
+        ruleprof.save(stats, self.path)
+        reparsed = parse.file2rules(rules.splitlines(), 'rules')
+        ruleprof.reorder(reparsed, ruleprof.load(self.path))
+        self.assertEqual(reparsed[0].order, reparsed[0].conditions)
+        # rules from elsewhere are left alone
+        other = parse.file2rules(rules.splitlines(), 'other')
+        ruleprof.reorder(other, stats)
+        self.assertEqual(other[0].order, list(reversed(other[0].conditions)))
+
+    def test_corrupt(self):
+        os.mkdir(os.path.dirname(self.path))
+        with open(self.path, 'wb') as fh:
+            fh.write('garbage')
+        self.assertEqual(ruleprof.load(self.path), {})
+        self.assertEqual(ruleprof.load(None), {})
+        ruleprof.save({('rules', 1, 0): (1, 0)}, self.path)
+        self.assertEqual(ruleprof.load(self.path), {('rules', 1, 0): (1, 0)})
@@ -0,0 +1,94 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import pickle
+import random
+import unittest
+
+from . import score
+
+
+def highest(items):
+    """The highest scoring items, computed from scratch."""
+    scores = [(k, sum(v) * len(v) ** -.5) for k, v in items.viewitems()]
+    if not scores:
+        return None
+    maxscore = max(x for k, x in scores)
+    return [(k, x) for k, x in scores if x == maxscore]
+
+
+class ScoreSetTestCase(unittest.TestCase):
+    def test_empty(self):
+        self.assertIsNone(score.ScoreSet().highest())
+        self.assertEqual(score.ScoreSet().scores(), [])
+
+    def test_tie_order(self):
+        s = score.ScoreSet()
+        for key in 'zyxwvu':
+            s.append((key, 100))
+        self.assertEqual(s.highest(), highest(s.items))
+        s.append(('x', 10))  # lowers x
+        self.assertEqual(s.highest(), highest(s.items))
+
+    def test_lowered(self):
+        s = score.ScoreSet()
+        s.append(('a', 9000))
+        s.append(('b', 7000))
+        s.append(('a', 100))  # 9100 / sqrt(2) < 9000
+        self.assertEqual(s.highest(), [('b', 7000.0)])
+        s.append(('a', -0.5))
+        self.assertEqual(s.highest(), highest(s.items))
+
+    def test_random(self):
+        rand = random.Random(0)
+        for n in xrange(200):
+            s = score.ScoreSet()
+            for i in xrange(rand.randrange(20)):
+                key = rand.choice('abcde')
+                value = rand.choice([-100, 0, 1, 10, 100, 0.1, 1e-17, 9000])
+                s.append((key, value))
+                self.assertEqual(s.scores(), [
+                    (k, sum(v) * len(v) ** -.5) for k, v in s.items.viewitems()
+                ])
+                if rand.random() < 0.5:
+                    self.assertEqual(s.highest(), highest(s.items))
+            self.assertEqual(s.highest(), highest(s.items))
+
+    def test_items(self):
+        items = {'a': [10, 20], 'b': [30], 'c': [20, 10]}
+        s = score.ScoreSet(dict(items))
+        self.assertEqual(s.highest(), highest(items))
+        s.append(('b', 1))
+        self.assertEqual(s.highest(), highest(s.items))
+
+    def test_pickle(self):
+        s = score.ScoreSet()
+        s.append(('a', 10))
+        s.append(('b', 10))
+        t = pickle.loads(pickle.dumps(s, pickle.HIGHEST_PROTOCOL))
+        t.append(('c', 20))
+        self.assertEqual(t.highest(), [('c', 20.0)])
+        self.assertEqual(s.highest(), highest(s.items))
+
+    def test_extend(self):
+        items = [('a', 10), ('b', 30), ('a', 20), ('c', -5)]
+        s, t = score.ScoreSet(), score.ScoreSet()
+        s.extend(items)
+        for item in items:
+            t.append(item)
+        self.assertEqual(s.items, t.items)
+        self.assertEqual(s.highest(), t.highest())
+        self.assertEqual(s.highest(), highest(s.items))
@@ -0,0 +1,88 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import StringIO
+import unittest
+
+from . import util
+
+
+class ReverseLinesTestCase(unittest.TestCase):
+    texts = [
+        '', '\n', 'a', 'a\n', 'a\nb', 'a\nb\n', 'a\r\nbb\r\n', '\n\nabc\n',
+        'header\n' + ''.join('line {}\n'.format(i) for i in xrange(100)),
+    ]
+
+    def test_reverse_lines(self):
+        for text in self.texts:
+            for bufsize in (1, 2, 3, 7, 65536):
+                fh = StringIO.StringIO(text)
+                self.assertEqual(
+                    list(util.reverse_lines(fh, 0, bufsize)),
+                    list(reversed(StringIO.StringIO(text).readlines())),
+                    (text, bufsize)
+                )
+
+    def test_start(self):
+        fh = StringIO.StringIO('header\nb\nc\n')
+        fh.readline()
+        self.assertEqual(
+            list(util.reverse_lines(fh, fh.tell(), 2)),
+            ['c\n', 'b\n']
+        )
+
+
+class LRUCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.evicted = []
+        self.cache = util.LRUCache(
+            3,
+            on_evict=lambda k, v: self.evicted.append((k, v))
+        )
+        for k in 'abc':
+            self.cache[k] = k.upper()
+
+    def test_evict_least_recently_used(self):
+        self.assertEqual(self.cache.get('a'), 'A')  # a is now most recent
+        self.cache['b'] = 'B2'  # b is now most recent
+        self.cache['d'] = 'D'
+        self.assertEqual(self.evicted, [('c', 'C')])
+        self.assertEqual(len(self.cache), 3)
+        self.assertNotIn('c', self.cache)
+        self.assertEqual(self.cache['b'], 'B2')
+        self.assertRaises(KeyError, lambda: self.cache['c'])
+        self.assertIsNone(self.cache.get('c'))
+
+    def test_values(self):
+        self.cache.get('a')
+        self.assertEqual(self.cache.values(), ['B', 'C', 'A'])
+        self.assertEqual(self.evicted, [])
+
+    def test_pop(self):
+        self.assertEqual(self.cache.pop('b'), 'B')
+        self.assertEqual(self.cache.pop('b', None), None)
+        self.assertRaises(KeyError, self.cache.pop, 'b')
+        self.cache['d'] = 'D'
+        self.cache['e'] = 'E'
+        self.assertEqual(self.evicted, [('a', 'A')])
+
+    def test_clear(self):
+        self.cache.get('a')
+        self.cache.clear()
+        self.assertEqual(self.evicted, [('b', 'B'), ('c', 'C'), ('a', 'A')])
+        self.assertEqual(len(self.cache), 0)
+        self.cache['x'] = 'X'
+        self.assertEqual(self.cache['x'], 'X')
@@ -0,0 +1,123 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+import decimal
+import os
+import shutil
+import StringIO
+import tempfile
+import unittest
+
+from . import config
+from . import writer
+from . import xn
+
+
+def mkxn(date, desc, amount):
+    amount = decimal.Decimal(amount)
+    return xn.Xn(
+        date=date,
+        desc=desc,
+        amount=amount,
+        src=[xn.Endpoint('Assets:Bank', -amount)],
+        dst=[
+            xn.Endpoint('Expenses:Food', amount - 1),
+            xn.Endpoint('Expenses:Tips', decimal.Decimal(1)),
+        ],
+    )
+
+
+class LedgerWriterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.outpat = os.path.join(self.dir, '{fy}-{month}.dat')
+        self.xns = [
+            mkxn(datetime.date(2012, month, 1), 'Lunch\nout', '12.50')
+            for month in (6, 7, 6, 8, 7)
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def contents(self):
+        result = {}
+        for name in os.listdir(self.dir):
+            with open(os.path.join(self.dir, name)) as f:
+                result[name] = f.read()
+        return result
+
+    def test_outpat(self):
+        for x in self.xns:
+            with open(config.format_outpat(self.outpat, x), 'a') as f:
+                print >> f, x.ledger()
+        expected = self.contents()
+        shutil.rmtree(self.dir)
+        os.mkdir(self.dir)
+
+        with writer.LedgerWriter(outpat=self.outpat, bufsize=10) as w:
+            for x in self.xns:
+                w.write(x)
+            self.assertEqual(len(w.files), 3)
+        self.assertEqual(self.contents(), expected)
+        entry = (
+            '2012/06/01  Lunch out\n'
+            '  Assets:Bank  $-12.50\n'
+            '  Expenses:Food  $11.50\n'
+            '  Expenses:Tips  $1\n'
+            '\n'
+        )
+        self.assertEqual(expected['2012-06.dat'], entry * 2)
+
+    def test_maxfiles(self):
+        with writer.LedgerWriter(outpat=self.outpat) as w:
+            for x in self.xns:
+                w.write(x)
+        expected = self.contents()
+        shutil.rmtree(self.dir)
+        os.mkdir(self.dir)
+
+        w = writer.LedgerWriter(outpat=self.outpat, maxfiles=1)
+        for x in self.xns:
+            w.write(x)
+            self.assertEqual(len(w.files), 1)
+        w.flush()
+        self.assertEqual(self.contents(), expected)
+        f, = w.files.values()
+        w.close()
+        self.assertTrue(f.closed)
+        self.assertEqual(len(w.files), 0)
+
+    def test_file(self):
+        f = StringIO.StringIO()
+        w = writer.LedgerWriter(file=f)
+        for x in self.xns:
+            w.write(x, validate=False)
+        w.close()
+        self.assertEqual(
+            f.getvalue(),
+            ''.join(x.ledger() + '\n' for x in self.xns)
+        )
+
+    def test_validate(self):
+        x = self.xns[0]
+        x.dst = x.dst[:1]
+        w = writer.LedgerWriter(file=StringIO.StringIO())
+        self.assertRaises(xn.XnBalanceError, w.write, x)
+        w.write(x, validate=False)
+
+    def test_no_output(self):
+        self.assertRaises(ValueError, writer.LedgerWriter)
@@ -0,0 +1,86 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import copy
+import cPickle
+import datetime
+import decimal
+import unittest
+
+from . import rule
+from . import xn
+
+
+class XnTestCase(unittest.TestCase):
+    def setUp(self):
+        amount = decimal.Decimal('4.50')
+        self.xn = xn.Xn(
+            date=datetime.date(2012, 7, 1),
+            desc='Coffee',
+            amount=amount,
+            src=[xn.Endpoint('Assets:Bank', -amount)],
+            dst=[xn.Endpoint('Expenses:Coffee', amount)],
+        )
+
+    def test_defaults(self):
+        x = xn.Xn()
+        self.assertEqual(
+            (x.date, x.desc, x.amount, x.src, x.dst, x.dropped),
+            (None, None, None, None, None, False)
+        )
+
+    def test_no_instance_dict(self):
+        self.assertRaises(AttributeError, setattr, self.xn, 'other', 1)
+        self.assertRaises(
+            AttributeError, setattr, self.xn.src[0], 'other', 1
+        )
+
+    def test_pickle_copy(self):
+        copies = [copy.copy(self.xn)] + [
+            cPickle.loads(cPickle.dumps(self.xn, protocol))
+            for protocol in xrange(cPickle.HIGHEST_PROTOCOL + 1)
+        ]
+        for x in copies:
+            self.assertEqual(repr(x), repr(self.xn))
+            self.assertEqual(x.ledger(), self.xn.ledger())
+
+    def test_add_outcomes(self):
+        r = rule.Rule(
+            rule.DestinationOutcome(value='Expenses:Coffee', score=10),
+            rule.DropOutcome(score=5),
+            rule.DestinationOutcome(value='Expenses:Food', score=20),
+            rule.DestinationOutcome(value='Expenses:Coffee', score=30),
+        )
+        self.assertEqual(r.grouped, [
+            ('dst', [
+                ('Expenses:Coffee', 10),
+                ('Expenses:Food', 20),
+                ('Expenses:Coffee', 30),
+            ]),
+            ('drop', [(None, 5)]),
+        ])
+        scores = {}
+        xn.add_outcomes(scores, r.grouped)
+        xn.add_outcomes(scores, r.grouped)
+        self.assertEqual(sorted(scores), ['drop', 'dst'])
+        self.assertEqual(scores['dst'].items, {
+            'Expenses:Coffee': [10, 30, 10, 30],
+            'Expenses:Food': [20, 20],
+        })
+        self.assertEqual(scores['drop'].items, {None: [5, 5]})
+
+    def test_unknown_outcome(self):
+        self.assertRaises(KeyError, rule.Rule, rule.Outcome(value=1, score=1))
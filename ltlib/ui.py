@@ -32,6 +32,11 @@ class RejectWarning(Warning):
     pass
 
 
+class DeferWarning(Warning):
+    """Input is required, but has been deferred for later review"""
+    pass
+
+
 def number(items):
     """Maps numbering onto given values"""
     n = len(items)
@@ -231,3 +236,21 @@ class UI(object):
             curry(filter_int, default=default, start=0, stop=len(items)),
             prompt
         )]
+
+
+class BatchUI(UI):
+    """Non-interactive user interface.
+
+    Output is discarded, and any request for input raises DeferWarning
+    so that the caller can set the current task aside for review.
+    """
+    def show(self, msg):
+        pass
+
+    def bail(self, msg=None):
+        if msg:
+            UI.show(self, 'BAIL OUT: ' + msg)
+        sys.exit(1)
+
+    def input(self, filter_fn, prompt):
+        raise DeferWarning(prompt)
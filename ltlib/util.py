@@ -15,7 +15,9 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import collections
+import cPickle as pickle
 import os
+import tempfile
 
 
 def flatten(xs):
@@ -26,3 +28,146 @@ def flatten(xs):
                 yield y
         else:
             yield x
+
+
+def reverse_lines(file, start=0, bufsize=65536):
+    """Generate the lines of a seekable file from last to first.
+
+    The file is read backwards ``bufsize`` bytes at a time, so memory
+    use is bounded by ``bufsize`` plus the longest line.  Lines before
+    offset ``start`` are not generated.  Lines keep their terminators,
+    as when iterating over a file.
+    """
+    file.seek(0, os.SEEK_END)
+    pos = file.tell()
+    end = True  # the next part yielded is the end of the file
+    tail = ''
+    while pos > start:
+        n = min(bufsize, pos - start)
+        pos -= n
+        file.seek(pos)
+        parts = (file.read(n) + tail).split('\n')
+        tail = parts.pop(0)  # may continue in the preceding chunk
+        for part in reversed(parts):
+            if end:
+                end = False
+                if part:
+                    yield part  # final line has no terminator
+            else:
+                yield part + '\n'
+    if tail or not end:
+        yield tail if end else tail + '\n'
+
+
+def dump_atomic(obj, path):
+    """Pickle obj to the file at path, which is replaced atomically.
+
+    The directory of path is created if need be.  Readers of path see
+    either the old or the new contents, never a partial write.
+    """
+    dir = os.path.dirname(path)
+    if not os.path.isdir(dir):
+        os.makedirs(dir)
+    fd, tmp = tempfile.mkstemp(dir=dir)
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            pickle.dump(obj, fh, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp, path)
+    except:
+        os.unlink(tmp)
+        raise
+
+
+class LRUCache(object):
+    """Mapping that holds at most ``maxsize`` items.
+
+    When a new item would exceed the limit, the least recently used
+    item is discarded; ``on_evict``, if given, is called with its key
+    and value.  Getting or setting an item counts as using it, but
+    ``in`` does not.
+    """
+
+    def __init__(self, maxsize, on_evict=None):
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1')
+        self.maxsize = maxsize
+        self.on_evict = on_evict
+        # links are [prev, next, key, value], in a circular list from
+        # least to most recently used; root is both its ends
+        self.links = {}
+        self.root = []
+        self.root[:] = [self.root, self.root, None, None]
+
+    def __len__(self):
+        return len(self.links)
+
+    def __contains__(self, key):
+        return key in self.links
+
+    def __getitem__(self, key):
+        link = self.links[key]
+        self._touch(link)
+        return link[3]
+
+    def get(self, key, default=None):
+        link = self.links.get(key)
+        if link is None:
+            return default
+        self._touch(link)
+        return link[3]
+
+    def __setitem__(self, key, value):
+        link = self.links.get(key)
+        if link is not None:
+            link[3] = value
+            self._touch(link)
+            return
+        if len(self.links) >= self.maxsize:
+            self._evict()
+        root = self.root
+        last = root[0]
+        last[1] = root[0] = self.links[key] = [last, root, key, value]
+
+    def values(self):
+        """Return a list of the values, least recently used first."""
+        values = []
+        link = self.root[1]
+        while link is not self.root:
+            values.append(link[3])
+            link = link[1]
+        return values
+
+    def pop(self, key, *default):
+        """Remove the item and return its value, without ``on_evict``."""
+        link = self.links.pop(key, None)
+        if link is None:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        link[0][1], link[1][0] = link[1], link[0]
+        return link[3]
+
+    def clear(self):
+        """Discard every item, least recently used first.
+
+        ``on_evict`` is called for each item, as if it had been evicted.
+        """
+        while self.links:
+            self._evict()
+
+    def _evict(self):
+        """Discard the least recently used item."""
+        oldest = self.root[1]
+        oldest[0][1], oldest[1][0] = oldest[1], oldest[0]
+        del self.links[oldest[2]]
+        if self.on_evict is not None:
+            self.on_evict(oldest[2], oldest[3])
+
+    def _touch(self, link):
+        """Make link the most recently used."""
+        root = self.root
+        last = root[0]
+        if link is not last:
+            link[0][1], link[1][0] = link[1], link[0]
+            link[0], link[1] = last, root
+            last[1] = root[0] = link
@@ -0,0 +1,92 @@
+# This file is part of ledgertools
+# Copyright (C) 2011 Fraser Tweedale
+#
+# ledgertools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+
+from . import config
+from . import util
+
+
+class LedgerWriter(object):
+    """Writes transactions to Ledger files.
+
+    Transactions are appended to ``file`` if given, otherwise to the
+    file named by expanding ``outpat`` (see ``config.format_outpat``)
+    for each transaction.  Files opened by the writer are kept open,
+    one per path, and written through a buffer of ``bufsize`` bytes
+    until the writer is flushed or closed.  At most ``maxfiles`` are
+    open at once; the least recently written is closed to make room
+    for another.  Files are flushed and synced to disk as they are
+    closed.  A file written by the writer is the same as if each
+    transaction had been printed to it separately.
+    """
+    def __init__(
+            self, file=None, outpat=None, bufsize=1 << 16, maxfiles=64):
+        if file is None and outpat is None:
+            raise ValueError('LedgerWriter needs a file or an outpat')
+        self.file = file
+        self.outpat = outpat
+        self.bufsize = bufsize
+        # path -> file opened by the writer
+        self.files = util.LRUCache(maxfiles, on_evict=self._close)
+        self.paths = {}  # date -> expanded outpat
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def open(self, xn):
+        """Return the file to which xn is to be written."""
+        if self.file is not None:
+            return self.file
+        path = self.paths.get(xn.date)
+        if path is None:
+            path = config.format_outpat(self.outpat, xn)
+            self.paths[xn.date] = path
+        f = self.files.get(path)
+        if f is None:
+            f = self.files[path] = open(path, 'a', self.bufsize)
+        return f
+
+    def write(self, xn, validate=True):
+        """Write a transaction, followed by a blank line.
+
+        ``validate`` is passed to ``Xn.ledger``; it can be false for
+        transactions that have already been balanced.
+        """
+        self.open(xn).write(xn.ledger(validate) + '\n')
+
+    def flush(self):
+        """Flush all files written to."""
+        if self.file is not None:
+            self.file.flush()
+        for f in self.files.values():
+            f.flush()
+
+    def close(self):
+        """Close the files opened by the writer, and flush ``file``."""
+        if self.file is not None:
+            self.file.flush()
+        self.files.clear()
+
+    def _close(self, path, f):
+        try:
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            f.close()
@@ -15,9 +15,10 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 # TODO use ui.bail, not sys.exit
+import itertools
 import sys
 
-from . import rule
+from . import index
 from . import score
 from . import ui
 
@@ -41,7 +42,22 @@ class XnBalanceError(Exception):
     pass
 
 
+def add_outcomes(scores, grouped):
+    """Add the outcomes of a matching rule to a dict of ScoreSets.
+
+    ``scores`` is keyed by the transaction field each outcome concerns,
+    as returned by ``Xn.match_rules``, and ``grouped`` is the rule's
+    ``grouped`` outcomes.
+    """
+    for key, items in grouped:
+        if key not in scores:
+            scores[key] = score.ScoreSet()  # initialise ScoreSet
+        scores[key].extend(items)
+
+
 class Endpoint(object):
+    __slots__ = ('account', 'amount')
+
     def __init__(self, account, amount):
         self.account = account
         self.amount = amount
@@ -49,16 +65,35 @@ class Endpoint(object):
     def __repr__(self):
         return 'Endpoint({!r}, {!r})'.format(self.account, self.amount)
 
+    def __reduce__(self):
+        return Endpoint, (self.account, self.amount)
+
 
 class Xn(object):
-    def __init__(self, **kwargs):
+    # statements and ledgers hold many transactions; no instance dict
+    __slots__ = ('date', 'desc', 'amount', 'src', 'dst', 'dropped')
+
+    def __init__(
+            self,
+            date=None,
+            desc=None,
+            amount=None,
+            src=None,
+            dst=None,
+            dropped=False):
         """Initialise the transaction object"""
-        self.dropped = kwargs['dropped'] if 'dropped' in kwargs else False
-        self.date = kwargs['date'] if 'date' in kwargs else None
-        self.desc = kwargs['desc'] if 'desc' in kwargs else None
-        self.amount = kwargs['amount'] if 'amount' in kwargs else None
-        self.dst = kwargs['dst'] if 'dst' in kwargs else None
-        self.src = kwargs['src'] if 'src' in kwargs else None
+        self.date = date
+        self.desc = desc
+        self.amount = amount
+        self.src = src
+        self.dst = dst
+        self.dropped = dropped
+
+    def __reduce__(self):
+        return Xn, (
+            self.date, self.desc, self.amount, self.src, self.dst,
+            self.dropped,
+        )
 
     def __repr__(self):
         return "Xn(\n" + '\n'.join(map(
@@ -69,21 +104,26 @@ class Xn(object):
     def __str__(self):
         return self.summary()
 
-    def ledger(self):
-        """Convert to a Ledger transaction (no trailing blank line)"""
-        self.balance()  # make sure the transaction balances
+    def ledger(self, validate=True):
+        """Convert to a Ledger transaction (no trailing blank line)
 
-        s = "{0}/{1:02}/{2:02}  {3}\n".format(
+        The transaction is first checked with ``balance``, unless
+        ``validate`` is false because that has already been done.
+        """
+        if validate:
+            self.balance()  # make sure the transaction balances
+
+        lines = ["{0}/{1:02}/{2:02}  {3}".format(
             self.date.year,
             self.date.month,
             self.date.day,
             self.desc.replace('\n', ' ')
-        )
-        for src in self.src:
-            s += "  {0.account}  ${0.amount}\n".format(src)
-        for dst in self.dst:
-            s += "  {0.account}  ${0.amount}\n".format(dst)
-        return s
+        )]
+        for ep in itertools.chain(self.src, self.dst):
+            # str() is what format() gives for a Decimal, only faster
+            lines.append("  {0}  ${1}".format(ep.account, str(ep.amount)))
+        lines.append('')
+        return '\n'.join(lines)
 
     def summary(self):
         """Return a string summary of transaction"""
@@ -130,6 +170,8 @@ class Xn(object):
     def match_rules(self, rules):
         """Process this transaction against the given ruleset
 
+        ``rules`` is a sequence of rules or an ``index.RuleIndex``.
+
         Returns a dict of fields with ScoreSet values, which may be empty.
         Notably, the rule processing will be shortcircuited if the Xn is
         already complete - in this case, None is returned.
@@ -142,26 +184,14 @@ class Xn(object):
 
         scores = {}
 
+        if isinstance(rules, index.RuleIndex):
+            for r in rules.matching(self):
+                add_outcomes(scores, r.grouped)
+            return scores
+
         for r in rules:
-            outcomes = r.match(self)
-            if not outcomes:
-                continue
-            for outcome in outcomes:
-                if isinstance(outcome, rule.SourceOutcome):
-                    key = 'src'
-                elif isinstance(outcome, rule.DestinationOutcome):
-                    key = 'dst'
-                elif isinstance(outcome, rule.DescriptionOutcome):
-                    key = 'desc'
-                elif isinstance(outcome, rule.DropOutcome):
-                    key = 'drop'
-                elif isinstance(outcome, rule.RebateOutcome):
-                    key = 'rebate'
-                else:
-                    raise KeyError
-                if key not in scores:
-                    scores[key] = score.ScoreSet()  # initialise ScoreSet
-                scores[key].append((outcome.value, outcome.score))
+            if r.match(self):
+                add_outcomes(scores, r.grouped)
 
         return scores
 